@@ -1,14 +1,108 @@
 #!/usr/bin/env python3
 # Scanner de ports avancé avec fermeture intelligente
 
-import socket, sys, time, platform, subprocess, os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import socket, sys, time, platform, subprocess, os, asyncio, selectors, heapq, errno, queue, threading, ipaddress
+import itertools, multiprocessing, collections, struct, json, base64, zlib, hashlib, re
+from concurrent.futures import ThreadPoolExecutor
 
 DEFAULT_TARGET = "localhost"
 DEFAULT_TIMEOUT = 0.8
 DEFAULT_WORKERS = 500
+MAX_THREAD_WORKERS = 1000
+DEFAULT_ENGINE = "auto"
+ASYNC_CONCURRENCY = 5000
+BANNER_TIMEOUT = 0.3
+BANNER_WORKERS = 64
+PROBE_TIMEOUT = 1.0
+PROBE_BUDGET = 15.0
+SHARD_BATCH = 256
+SHARD_FLUSH_INTERVAL = 0.2
+RTT_MIN_TIMEOUT = 0.1
+RTT_MAX_TIMEOUT = 3.0
+MAX_TARGETS = 65536  # hôtes au plus par scan (un /16 IPv4), vérifié avant toute expansion
 COMMON_PORTS = [21,22,23,25,53,80,88,110,111,123,135,139,143,161,389,443,445,465,514,631,993,995,1433,1521,3306,3389,5900,8080,8443,8000]
-ALL_PORTS = list(range(1, 65536))
+ALL_PORTS = range(1, 65536)
+
+# Ports TCP classés par probabilité d'ouverture décroissante; la table couvre tout le
+# « top 1000 » de nmap. Ordre des tranches: fréquences d'ouverture de nmap-services (tête),
+# services d'infrastructure actuels (bases, conteneurs, supervision, files de messages),
+# autres ports nmap de service connu classés par famille, plages d'allocation dynamique
+# (Windows 1025+, RPC Sun 32768+, Windows 49152+) entrelacées dans leur ordre d'attribution,
+# puis ports sans service identifié, quasi ex aequo, répartis par plage de ports.
+# topN prend les N premiers; au-delà de la table, les ports restants suivent l'ordre croissant.
+PORT_FREQUENCY = [
+    80,23,443,21,22,25,3389,110,445,139,143,53,135,3306,8080,1723,111,995,993,5900,
+    1025,587,8888,199,1720,465,548,113,81,6001,10000,514,5060,179,1026,2000,8443,8000,32768,554,
+    26,1433,49152,2001,515,8008,49154,1027,5666,646,5000,5631,631,49153,8081,2049,88,79,5800,106,
+    2121,1110,49155,6000,513,990,5357,427,49156,543,544,5101,144,7,389,8009,3128,444,9999,5009,
+    7070,5190,3000,5432,1900,3986,13,1029,9,5051,6646,49157,1028,873,1755,2717,4899,9100,119,37,
+    1000,3001,5001,82,10010,1030,9090,2107,1024,2103,6004,1801,5050,19,8031,1041,255,2967,1049,1048,
+    1053,3703,1056,1065,1064,1054,17,808,3689,1031,1044,1071,5901,100,9102,8010,2869,1039,5120,4001,
+    9000,2105,636,1038,2601,1,7000,1066,1069,625,311,280,254,4000,1993,1761,5003,2002,2005,1998,
+    1032,1050,6112,3690,1521,2161,6002,1080,2401,4045,902,7937,787,1058,2383,32771,1033,1040,1059,50000,
+    5555,10001,1494,593,2301,3,3268,7938,1234,1022,1074,8002,1036,1035,9001,1037,464,497,1935,6666,
+    6543,24,1352,3269,1111,407,500,20,2006,3260,15000,1218,1034,4444,264,2004,42510,3052,1500,1051,
+    1047,6379,27017,9200,11211,5672,6443,2375,2376,10250,5985,5986,5984,9300,15672,8086,9092,2181,8082,8001,
+    7001,8085,9080,8090,8181,8880,8180,749,2222,2323,8983,8161,61616,4848,9043,9060,9443,7002,7443,8088,
+    5433,1434,3307,33060,6380,26379,27018,27019,28017,7474,7687,8529,9042,7199,5601,9600,4369,25672,1883,8883,
+    5671,61613,11214,8091,8092,11210,18091,50070,50075,8020,8042,16010,60010,9083,4040,7077,8998,18080,2380,2379,
+    8500,8300,8301,8600,4646,4647,6783,10255,10256,30000,32000,6781,8472,4789,2377,7946,9323,9093,9094,9091,
+    3100,9411,14268,16686,5044,5140,24224,8125,8126,6831,4317,4318,9095,1194,1701,4500,1812,1813,3478,5349,
+    5061,5062,5038,4569,8021,8089,8083,5902,1001,5903,8084,2100,6667,5222,8087,9101,3390,4443,8100,5801,
+    1002,5269,9418,7777,8800,512,5802,2048,8200,9103,8022,4445,8222,6669,7778,5904,109,8007,8011,8333,
+    2525,5280,8099,8093,9081,8400,8383,8899,5910,5911,6668,563,992,161,1311,691,42,49,43,2179,
+    2381,2382,2638,2393,2394,2725,1666,1863,1503,1719,1524,1583,1556,1972,1947,1984,1999,1186,1119,1114,
+    1300,783,888,880,800,801,843,901,900,903,898,5080,83,3333,911,84,5002,912,85,3300,
+    981,89,5100,987,90,5200,999,4002,7100,6003,8192,7004,7200,1099,1098,6881,5500,4662,5550,6346,
+    5678,6969,4242,8291,4567,6699,8649,6789,8402,7999,8651,8873,8701,9050,9040,9595,9593,9900,9594,9618,
+    9500,9898,9876,9944,9943,9666,9535,9290,9968,9207,9485,9220,9415,20000,16001,12000,16000,14000,2605,2602,
+    2604,2160,2190,2111,2701,2702,2998,2809,2366,2200,2522,2399,2260,1042,32769,1043,49158,1045,1046,32770,
+    1052,1055,49159,32772,1057,1060,1061,32773,1062,49160,1063,32774,1067,1068,32775,1070,49161,1072,1073,32776,
+    1075,1076,49163,32777,1077,1078,1079,32778,49165,1081,1082,32779,1083,1084,49167,1085,32780,1086,1087,32781,
+    1088,49175,1089,32782,1090,1091,1092,32783,49176,1093,1094,32784,1095,1096,49400,1097,32785,1100,3493,6566,
+    10082,70,6005,6006,6007,2811,2119,2135,2607,2608,777,163,1236,5989,5988,16992,6101,705,6100,62078,
+    6129,16993,5999,5998,5987,9099,27000,7676,366,5906,5907,13782,5225,58080,5226,9110,13783,9111,524,8292,
+    8290,8254,13722,8194,8193,60443,3071,24800,1443,458,1455,1461,1501,11111,1580,1594,1600,12345,1641,541,
+    50389,1658,1687,31337,1688,1700,1717,1718,10002,555,1721,1102,50636,1104,10003,1105,1106,1107,1108,10004,
+    666,1112,1113,1117,10009,1121,55555,1122,1123,10012,222,1124,1126,1130,1131,10024,1132,1137,50001,1138,
+    1023,10025,1141,1145,1147,1148,10180,1149,1151,1152,1021,10215,1154,50002,1163,1164,10243,1165,1166,1169,
+    4,1174,10566,1175,1183,50003,1185,10616,1187,1192,1198,6,1199,10617,1201,1213,1216,10621,1217,65000,
+    1233,30,1244,10626,1247,1248,1259,1271,10628,1272,1277,32,49999,1287,10629,1296,1301,1309,1310,10778,
+    1322,1328,33,1334,11110,1417,50006,1533,1782,11967,1783,1805,99,1839,1840,12174,1862,1864,50300,1875,
+    12265,1914,1971,125,1974,2003,13456,2007,2008,2009,14238,2010,50500,146,2013,2020,14441,2021,2022,2030,
+    2033,14442,2034,211,2035,50800,2038,15002,2040,2041,2042,2043,15003,2045,212,2046,2047,15004,2065,51103,
+    2068,2099,15660,2106,256,2126,2144,2170,15742,2191,2196,51493,2251,16012,2288,259,2492,2500,2557,16016,
+    2710,2718,2800,16018,301,2875,52673,2909,2910,16080,2920,2968,3003,3005,16113,306,3006,3007,52822,3011,
+    17877,3013,3017,3030,340,3031,17988,3077,3168,3211,18040,3221,52848,3261,3283,406,18101,3301,3322,3323,
+    3324,18988,3325,3351,52869,3367,416,19101,3369,3370,3371,3372,19283,3404,3476,417,3517,19315,3527,54045,
+    3546,3551,19350,3580,3659,3737,425,3766,19780,3784,3800,54328,3801,19801,3809,3814,481,3826,3827,19842,
+    3828,3851,3869,20005,3871,55055,3878,545,3880,20031,3889,3905,3914,3918,20221,3920,3945,616,55056,3971,
+    20222,3995,3998,4003,4004,20828,4005,617,4006,4111,21571,4125,55600,4126,4129,22939,4224,4279,648,4321,
+    4343,23502,4446,4449,56737,4550,24444,4900,667,4998,5004,5030,25734,5033,5054,5087,25735,5102,56738,668,
+    5214,5221,26214,5298,5405,5414,5431,27352,5440,683,5510,57294,5544,27353,5560,5566,5633,5679,27355,687,
+    5718,5730,5810,27356,5811,57797,5815,5822,27715,5825,700,5850,5859,5862,28201,5877,5915,60020,5922,30718,
+    711,5925,5950,5952,5959,30951,5960,5961,5962,31038,714,5963,61532,6009,6025,33354,6059,6106,6123,6156,
+    720,33899,6389,6502,61900,6510,34571,6547,6565,6567,722,6580,34572,6689,6692,6779,34573,6788,63331,6792,
+    6839,726,35500,6901,7007,7019,7025,38292,7103,7106,64623,765,7201,40193,7402,7435,7496,7512,40911,7625,
+    7627,1007,7741,41511,7800,64680,7911,7920,44176,7921,8045,8652,1009,8654,44442,8994,9002,65129,9003,44443,
+    9009,9010,1010,9011,9071,44501,9502,9503,9575,45100,9877,65389,9878,1011,9917,48080,9929,9998,
+]
+_PORT_RANK = {p: i for i, p in enumerate(PORT_FREQUENCY)}
+_PORTS_BY_FREQUENCY = None
+
+def ports_by_frequency():
+    """Les 65535 ports, du plus souvent ouvert au moins probable (calculé une fois)"""
+    global _PORTS_BY_FREQUENCY
+    if _PORTS_BY_FREQUENCY is None:
+        _PORTS_BY_FREQUENCY = PORT_FREQUENCY + [p for p in ALL_PORTS if p not in _PORT_RANK]
+    return _PORTS_BY_FREQUENCY
+
+def rank_ports(ports):
+    """Ordonne des ports par probabilité d'ouverture décroissante (non classés: ordre croissant)"""
+    if isinstance(ports, range) and ports == ALL_PORTS:
+        return ports_by_frequency()
+    unranked = len(PORT_FREQUENCY)
+    return sorted(ports, key=lambda p: (_PORT_RANK.get(p, unranked), p))
 
 def parse_ports(arg):
     """Analyse l'argument des ports et retourne une liste de ports à scanner"""
@@ -22,9 +116,9 @@ def parse_ports(arg):
     elif arg.lower().startswith("top"):
         try:
             num = int(arg[3:]) if len(arg) > 3 else 1000
-            return list(range(1, min(num + 1, 65536)))
         except:
-            return list(range(1, 1001))
+            num = 1000
+        return ports_by_frequency()[:max(0, num)]
     
     parts = arg.split(',')
     ports = set()
@@ -37,21 +131,196 @@ def parse_ports(arg):
             ports.add(int(p))
     return sorted(p for p in ports if 0 <= p <= 65535)
 
-def scan_port(target_ip, port, timeout=DEFAULT_TIMEOUT):
-    """Scanne un port spécifique et retourne son statut"""
+def parse_targets(arg):
+    """Analyse l'argument cible et retourne la liste des hôtes à scanner.
+
+    Accepte un hôte, une liste séparée par des virgules, un bloc CIDR (10.0.0.0/22),
+    une plage (10.0.0.1-20 ou 10.0.0.1-10.0.0.20) ou un fichier d'hôtes
+    (@hosts.txt ou chemin existant, un hôte par ligne, '#' pour les commentaires).
+    Lève ValueError si l'ensemble dépasse MAX_TARGETS hôtes (p. ex. un /64 IPv6).
+    """
+    targets = []
+
+    def add(count, hosts):
+        # Taille contrôlée avant de matérialiser le bloc ou la plage
+        if len(targets) + count > MAX_TARGETS:
+            raise ValueError(f"trop d'hôtes ({len(targets) + count}, maximum {MAX_TARGETS}): "
+                             f"découpez la cible en blocs plus petits")
+        targets.extend(hosts)
+
+    for part in arg.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if part.startswith('@') or os.path.isfile(part):
+            path = part[1:] if part.startswith('@') else part
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.split('#', 1)[0].strip()
+                    if line:
+                        hosts = parse_targets(line)
+                        add(len(hosts), hosts)
+            continue
+        if '/' in part:
+            net = ipaddress.ip_network(part, strict=False)
+            if net.num_addresses <= 2:
+                # /31, /32, /127, /128: toutes les adresses (hosts() exclut sinon réseau et broadcast)
+                add(net.num_addresses, (str(h) for h in net))
+            else:
+                hosts = net.hosts()
+                add(net.num_addresses - (2 if net.version == 4 else 1), (str(h) for h in hosts))
+            continue
+        if '-' in part:
+            a, b = part.split('-', 1)
+            try:
+                first = ipaddress.ip_address(a.strip())
+            except ValueError:
+                first = None  # nom d'hôte contenant un tiret
+            if first is not None:
+                b = b.strip()
+                sep = '.' if first.version == 4 else ':'
+                if '.' in b or ':' in b:
+                    last = ipaddress.ip_address(b)
+                else:
+                    last = ipaddress.ip_address(a.strip().rsplit(sep, 1)[0] + sep + b)
+                if last.version != first.version or last < first:
+                    raise ValueError(f"plage d'adresses invalide: {part}")
+                # type(first): un petit entier donnerait sinon une adresse IPv4 (::1-3)
+                add(int(last) - int(first) + 1, (str(type(first)(i)) for i in range(int(first), int(last) + 1)))
+                continue
+        add(1, [part])
+    return targets
+
+def resolve_addresses(target):
+    """Toutes les adresses IPv4/IPv6 d'une cible via getaddrinfo.
+
+    Retourne (ipv4, ipv6), chaque liste dans l'ordre de préférence du système.
+    """
+    v4, v6 = [], []
+    for af, _, _, _, sa in socket.getaddrinfo(target, None, socket.AF_UNSPEC, socket.SOCK_STREAM):
+        if af == socket.AF_INET and sa[0] not in v4:
+            v4.append(sa[0])
+        elif af == socket.AF_INET6 and sa[0] not in v6:
+            v6.append(sa[0])
+    return v4, v6
+
+def resolve_targets(targets, all_addresses=False):
+    """Résout chaque cible une seule fois; retourne ([(cible, ip)], [(cible, erreur)]).
+
+    Par défaut une adresse par cible: IPv4 si disponible (comme gethostbyname),
+    sinon IPv6 -> les services IPv6-only restent visibles. Avec all_addresses,
+    toutes les adresses des deux familles sont retournées, entrelacées (RFC 8305)
+    pour être scannées ensemble.
+    """
+    resolved, errors, seen = [], [], set()
+    for target in targets:
+        try:
+            v4, v6 = resolve_addresses(target)
+        except Exception as e:
+            errors.append((target, e))
+            continue
+        if all_addresses:
+            ips = [ip for pair in itertools.zip_longest(v6, v4) for ip in pair if ip]
+        else:
+            ips = (v4 or v6)[:1]
+        if not ips:
+            errors.append((target, "aucune adresse"))
+        for ip in ips:
+            if ip not in seen:
+                seen.add(ip)
+                resolved.append((target, ip))
+    return resolved, errors
+
+def family_for(host):
+    """AF_INET6 pour une adresse IPv6 littérale, AF_INET sinon"""
+    return socket.AF_INET6 if ":" in host else socket.AF_INET
+
+def merge_open_ports(open_ports, ips):
+    """Fusionne par port les ports ouverts de plusieurs adresses d'une même cible.
+
+    Retourne [(port, banner)] (premier banner non vide) et {port: [ips]}.
+    """
+    merged, where = {}, {}
+    for ip in ips:
+        for port, banner in open_ports.get(ip, []):
+            if not merged.get(port):
+                merged[port] = banner
+            where.setdefault(port, []).append(ip)
+    return sorted(merged.items()), where
+
+def host_sort_key(host):
+    """Clé de tri numérique des adresses (repli sur le texte pour les noms)"""
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
+        ip = ipaddress.ip_address(host)
+        return (ip.version, int(ip), "")
+    except ValueError:
+        return (99, 0, host)
+
+class RttEstimator:
+    """Estimateur de RTT lissé (SRTT + 4·RTTVAR, façon RFC 6298) pour une cible.
+
+    Alimenté par les connexions abouties ou refusées; tant qu'aucun échantillon
+    n'est disponible, le timeout initial (paliers historiques) est utilisé.
+    """
+
+    def __init__(self, initial=DEFAULT_TIMEOUT, min_timeout=RTT_MIN_TIMEOUT, max_timeout=RTT_MAX_TIMEOUT):
+        self.initial = initial
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def sample(self, rtt):
+        """Intègre une mesure de RTT (secondes)"""
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+                self.srtt = 0.875 * self.srtt + 0.125 * rtt
+            self.samples += 1
+
+    def timeout(self):
+        """Timeout de connexion courant, borné par [min_timeout, max_timeout]"""
+        if self.srtt is None:
+            return self.initial
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+def connect_timeout(timeout):
+    """Résout un timeout fixe ou un RttEstimator en secondes"""
+    return timeout.timeout() if isinstance(timeout, RttEstimator) else timeout
+
+def record_rtt(timeout, rtt):
+    """Transmet une mesure de RTT à l'estimateur éventuel"""
+    if isinstance(timeout, RttEstimator):
+        timeout.sample(rtt)
+
+def scan_port(target_ip, port, timeout=DEFAULT_TIMEOUT, banner=True):
+    """Scanne un port spécifique et retourne son statut.
+
+    `timeout` peut être un nombre ou un RttEstimator (timeout adaptatif).
+    Avec banner=False (balayage seul), aucune lecture n'est faite sur un port ouvert.
+    """
+    try:
+        sock = socket.socket(family_for(target_ip), socket.SOCK_STREAM)
+        sock.settimeout(connect_timeout(timeout))
+        started = time.monotonic()
         code = sock.connect_ex((target_ip, port))
+        if code in (0, errno.ECONNREFUSED, 10061):  # 10061 = WSAECONNREFUSED
+            record_rtt(timeout, time.monotonic() - started)
         if code == 0:
-            try:
-                sock.settimeout(0.3)
-                banner = sock.recv(512)
-                banner = banner.decode(errors="ignore").strip()
-            except Exception:
-                banner = ""
+            text = ""
+            if banner:
+                try:
+                    sock.settimeout(BANNER_TIMEOUT)
+                    text = sock.recv(512).decode(errors="ignore").strip()
+                except Exception:
+                    text = ""
             sock.close()
-            return (port, "open", banner)
+            return (port, "open", text)
         else:
             sock.close()
             return (port, "closed", "")
@@ -60,9 +329,1110 @@ def scan_port(target_ip, port, timeout=DEFAULT_TIMEOUT):
     except Exception as e:
         return (port, "filtered", str(e))
 
-def get_local_ips():
-    """Récupère toutes les adresses IP locales de la machine"""
-    ips = {"127.0.0.1", "::1", "localhost"}
+async def scan_port_async(target_ip, port, timeout=DEFAULT_TIMEOUT, banner=True):
+    """Version asyncio de scan_port (même tuple (port, statut, banner))"""
+    started = time.monotonic()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(target_ip, port), connect_timeout(timeout))
+        record_rtt(timeout, time.monotonic() - started)
+    except asyncio.TimeoutError:
+        return (port, "filtered", "timeout")
+    except OSError as e:
+        # connect_ex() renvoie un code non nul dans ces cas -> même classification
+        if isinstance(e, ConnectionRefusedError):
+            record_rtt(timeout, time.monotonic() - started)
+        if e.errno is not None:
+            return (port, "closed", "")
+        return (port, "filtered", str(e))
+    except Exception as e:
+        return (port, "filtered", str(e))
+    text = ""
+    if banner:
+        try:
+            data = await asyncio.wait_for(reader.read(512), BANNER_TIMEOUT)
+            text = data.decode(errors="ignore").strip()
+        except Exception:
+            text = ""
+    try:
+        writer.close()
+    except Exception:
+        pass
+    return (port, "open", text)
+
+def raise_nofile_limit(wanted):
+    """Augmente (best-effort) la limite de descripteurs ouverts pour les gros scans"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        if soft != resource.RLIM_INFINITY and soft < target:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        return soft
+    except Exception:
+        return None
+
+class AimdController:
+    """Contrôleur AIMD du nombre de connexions en vol.
+
+    À chaque fenêtre d'environ `limit` résultats (un « aller-retour » de la fenêtre),
+    si le taux de 'filtered' dépasse la ligne de base (meilleure fenêtre observée) de
+    plus de `loss_threshold`, la limite est divisée par deux; sinon elle augmente de
+    `increase`. La ligne de base évite d'étrangler un hôte entièrement filtré.
+    """
+
+    def __init__(self, initial, minimum=10, maximum=MAX_THREAD_WORKERS, window=200,
+                 loss_threshold=0.05, increase=None):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.window = window
+        self.loss_threshold = loss_threshold
+        self.increase = increase or max(1, self.limit // 10)
+        self.baseline = None
+        self._seen = 0
+        self._filtered = 0
+
+    def record(self, status):
+        """Comptabilise un résultat de scan et ajuste la limite en fin de fenêtre"""
+        self._seen += 1
+        if status == "filtered":
+            self._filtered += 1
+        if self._seen >= max(self.window, self.limit):
+            self._adjust(self._filtered / self._seen)
+            self._seen = self._filtered = 0
+
+    def _adjust(self, ratio):
+        if self.baseline is None or ratio < self.baseline:
+            self.baseline = ratio
+        if ratio > self.baseline + self.loss_threshold:
+            self.limit = max(self.minimum, self.limit // 2)
+        else:
+            self.limit = min(self.maximum, self.limit + self.increase)
+
+class TokenBucket:
+    """Seau à jetons partagé: plafonne le nombre de connexions lancées par seconde.
+
+    `rate` jetons par seconde, réserve de `burst` jetons (1/20 s de débit par défaut)
+    pour lisser sans autoriser de rafale. Thread-safe; `reserve()` prend un jeton
+    quitte à s'endetter et retourne l'attente à respecter avant de se connecter.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate / 20))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.started = None
+        self.granted = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.started is None:
+            self.started = now
+
+    def reserve(self):
+        """Prend un jeton et retourne le délai (s) avant de pouvoir l'utiliser"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            self.granted += 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def try_acquire(self):
+        """Prend un jeton s'il y en a un (retourne 0), sinon retourne l'attente sans rien prendre"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.granted += 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Bloque jusqu'à l'obtention d'un jeton"""
+        time.sleep(self.reserve())
+
+    def achieved(self):
+        """Débit effectivement servi depuis le premier jeton (jetons/s, réservations futures exclues)"""
+        with self._lock:
+            if self.started is None:
+                return 0.0
+            now = time.monotonic()
+            self._refill(now)
+            served = self.granted - max(0.0, -self.tokens)
+            elapsed = now - self.started
+        return served / elapsed if elapsed > 0 else 0.0
+
+def submit_bounded(executor, fn, items, window):
+    """Soumet fn(item) au fil de l'eau avec au plus `window` tâches en attente.
+
+    Produit les résultats dans l'ordre d'achèvement; la mémoire reste constante
+    quelle que soit la taille de `items` (consommé paresseusement).
+    `window` peut être un entier ou une fonction relue à chaque soumission.
+    """
+    done = queue.SimpleQueue()
+    pending = set()
+    items = iter(items)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < (window() if callable(window) else window):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                fut = executor.submit(fn, item)
+                pending.add(fut)
+                fut.add_done_callback(done.put)
+            if not pending:
+                break
+            fut = done.get()
+            pending.discard(fut)
+            yield fut.result()
+    finally:
+        # Arrêt anticipé: ne pas laisser exécuter les tâches pas encore démarrées
+        for fut in pending:
+            fut.cancel()
+
+def timeout_for(timeout, host):
+    """Timeout (fixe, RttEstimator ou dict hôte -> RttEstimator) applicable à un hôte"""
+    return timeout[host] if isinstance(timeout, dict) else timeout
+
+def scan_jobs_threads(jobs, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS, controller=None, limiter=None):
+    """Moteur historique: un thread bloquant par connexion, soumission bornée à 2×workers
+    (ou à la limite courante du contrôleur AIMD). Balayage seul, sans banner.
+    Avec un TokenBucket `limiter`, chaque thread attend son jeton avant de se connecter."""
+    window = (lambda: controller.limit) if controller else 2 * workers
+
+    def scan_job(job):
+        host, port = job
+        if limiter:
+            limiter.acquire()
+        return (host,) + scan_port(host, port, timeout_for(timeout, host), banner=False)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        yield from submit_bounded(ex, scan_job, jobs, window)
+
+def scan_jobs_asyncio(jobs, timeout=DEFAULT_TIMEOUT, workers=ASYNC_CONCURRENCY, controller=None, limiter=None):
+    """Moteur asyncio: jusqu'à `workers` connexions en vol depuis un seul thread.
+
+    Les résultats sont produits au fur et à mesure (balayage seul, sans banner);
+    fermer le générateur annule le scan. Avec un contrôleur AIMD, les workers d'indice >= controller.limit se retirent et
+    sont relancés quand la limite remonte.
+    """
+    limit = raise_nofile_limit(workers + 256)
+    if limit:
+        workers = max(1, min(workers, limit - 64))
+    job_iter = iter(jobs)
+    exhausted = False
+    tasks = {}  # indice -> tâche du worker vivant
+    loop = asyncio.new_event_loop()
+    results = None
+
+    async def worker(index):
+        nonlocal exhausted
+        # L'itérateur est partagé: chaque worker prend le prochain couple (hôte, port) libre
+        while not exhausted and (controller is None or index < controller.limit):
+            job = next(job_iter, None)
+            if job is None:
+                exhausted = True
+                break
+            host, port = job
+            if limiter:
+                await asyncio.sleep(limiter.reserve())
+            result = await scan_port_async(host, port, timeout_for(timeout, host), banner=False)
+            await results.put((host,) + result)
+        await results.put(index)
+
+    async def spawn(count):
+        nonlocal results
+        if results is None:
+            results = asyncio.Queue()
+        for i in range(count):
+            if i not in tasks:
+                tasks[i] = loop.create_task(worker(i))
+
+    def wanted():
+        return workers if controller is None else min(workers, controller.limit)
+
+    loop.run_until_complete(spawn(wanted()))
+    try:
+        while tasks:
+            item = loop.run_until_complete(results.get())
+            while True:
+                if isinstance(item, int):
+                    tasks.pop(item, None)  # worker terminé ou retiré
+                else:
+                    yield item
+                if results.empty():
+                    break
+                item = results.get_nowait()
+            if not exhausted and len(tasks) < wanted():
+                loop.run_until_complete(spawn(wanted()))
+    finally:
+        for t in tasks.values():
+            t.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.wait(list(tasks.values())))
+        loop.close()
+
+CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}  # 10035 = WSAEWOULDBLOCK
+
+def scan_jobs_selectors(jobs, timeout=DEFAULT_TIMEOUT, workers=ASYNC_CONCURRENCY, controller=None, limiter=None):
+    """Moteur selectors (epoll sous Linux): connexions non bloquantes dans une seule boucle.
+
+    Chaque socket en cours est suivi dans un tas d'échéances; le statut est lu via SO_ERROR.
+    Balayage seul: les banners sont récupérés par le second étage (with_banners).
+    Sous Windows les échecs de connexion ne sont pas signalés par select() -> préférer 'threads'.
+    Avec un TokenBucket `limiter`, le remplissage s'interrompt faute de jeton et la boucle
+    se réveille à temps pour le suivant.
+    """
+    limit = raise_nofile_limit(workers + 256)
+    if limit:
+        workers = max(1, min(workers, limit - 64))
+    sel = selectors.DefaultSelector()
+    job_iter = iter(jobs)
+    pending = {}   # socket -> [(hôte, port), échéance, début]
+    deadlines = []  # tas (échéance, seq, socket), entrées périmées ignorées
+    seq = 0
+    exhausted = False
+
+    def finish(sock):
+        try:
+            sel.unregister(sock)
+        except Exception:
+            pass
+        pending.pop(sock, None)
+        sock.close()
+
+    try:
+        while True:
+            # Remplir la fenêtre de connexions en vol
+            paced = None
+            while not exhausted and len(pending) < (min(workers, controller.limit) if controller else workers):
+                if limiter:
+                    paced = limiter.try_acquire() or None
+                    if paced:
+                        break
+                job = next(job_iter, None)
+                if job is None:
+                    exhausted = True
+                    break
+                host, port = job
+                host_timeout = timeout_for(timeout, host)
+                try:
+                    sock = socket.socket(family_for(host), socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    started = time.monotonic()
+                    code = sock.connect_ex((host, port))
+                except Exception as e:
+                    yield (host, port, "filtered", str(e))
+                    continue
+                if code == 0:
+                    record_rtt(host_timeout, time.monotonic() - started)
+                    sock.close()
+                    yield (host, port, "open", "")
+                elif code in CONNECT_PENDING:
+                    deadline = started + connect_timeout(host_timeout)
+                    sel.register(sock, selectors.EVENT_WRITE)
+                    pending[sock] = [job, deadline, started]
+                    seq += 1
+                    heapq.heappush(deadlines, (deadline, seq, sock))
+                else:
+                    sock.close()
+                    yield (host, port, "closed", "")
+            if not pending and not paced:
+                break
+
+            wait = max(0.0, deadlines[0][0] - time.monotonic()) if deadlines else None
+            if paced:
+                wait = paced if wait is None else min(wait, paced)
+            for key, _ in sel.select(wait):
+                sock = key.fileobj
+                (host, port), _, started = pending[sock]
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                finish(sock)
+                if err in (0, errno.ECONNREFUSED):
+                    record_rtt(timeout_for(timeout, host), time.monotonic() - started)
+                if err == 0:
+                    yield (host, port, "open", "")
+                elif err == errno.ETIMEDOUT:
+                    yield (host, port, "filtered", "timeout")
+                else:
+                    yield (host, port, "closed", "")
+
+            # Échéances dépassées -> filtré
+            now = time.monotonic()
+            while deadlines and deadlines[0][0] <= now:
+                deadline, _, sock = heapq.heappop(deadlines)
+                state = pending.get(sock)
+                if state is None or state[1] != deadline:
+                    continue
+                host, port = state[0]
+                finish(sock)
+                yield (host, port, "filtered", "timeout")
+    finally:
+        for sock in list(pending):
+            finish(sock)
+        sel.close()
+
+ENGINES = {
+    "threads": scan_jobs_threads,
+    "asyncio": scan_jobs_asyncio,
+    "selectors": scan_jobs_selectors,
+}
+
+def resolve_engine(engine, num_ports):
+    """Choisit le moteur effectif: 'auto' -> selectors pour les gros scans hors Windows"""
+    if engine != "auto":
+        return engine
+    if num_ports > 1000 and "windows" not in platform.system().lower():
+        return "selectors"
+    return "threads"
+
+def plan_concurrency(engine, workers, num_ports, adaptive=True):
+    """Retourne (capacité du moteur, contrôleur AIMD ou None).
+
+    Les moteurs événementiels ne coûtent pas un thread par connexion: leur plafond
+    n'est borné que par les descripteurs. En mode adaptatif, `workers` (formule
+    statique) devient la valeur de départ du contrôleur.
+    """
+    if engine in ("asyncio", "selectors"):
+        cap = max(1, min(ASYNC_CONCURRENCY, num_ports))
+    elif adaptive:
+        cap = max(1, min(MAX_THREAD_WORKERS, max(workers, num_ports)))
+    else:
+        cap = workers
+    if not adaptive:
+        return cap, None
+    return cap, AimdController(initial=workers, maximum=cap)
+
+def scan_targets(target_ips, ports, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS, engine=DEFAULT_ENGINE,
+                 controller=None, banner=True, limiter=None, done=None):
+    """Scanne plusieurs hôtes sous un budget de concurrence global.
+
+    Les couples (hôte, port) sont entrelacés port par port pour répartir la charge
+    entre les cibles; produit des tuples (hôte, port, statut, banner).
+    `timeout` peut être un dict hôte -> RttEstimator (un estimateur par cible).
+    Avec banner=False le second étage (récupération des banners) est sauté.
+    `limiter` (TokenBucket) plafonne les connexions par seconde, tous moteurs confondus.
+    Les couples présents dans `done` (p. ex. un ScanCheckpoint repris) sont sautés.
+    """
+    target_ips = list(target_ips)
+    engine = resolve_engine(engine, len(ports) * len(target_ips))
+    jobs = iter_jobs(target_ips, ports)
+    if done is not None:
+        jobs = (job for job in jobs if job not in done)
+    results = scan_jobs(jobs, timeout, workers, engine, controller, limiter)
+    return with_banners(results) if banner else results
+
+def _recv_until(sock, marker, limit=4096):
+    """Lit jusqu'à `marker`, fermeture ou `limit` octets (timeout du socket par lecture)"""
+    data = b""
+    deadline = time.monotonic() + PROBE_TIMEOUT
+    while marker not in data and len(data) < limit and time.monotonic() < deadline:
+        try:
+            chunk = sock.recv(limit - len(data))
+        except socket.timeout:
+            break
+        if not chunk:
+            break
+        data += chunk
+    return data.decode(errors="ignore")
+
+def probe_http(sock, host):
+    """HEAD / -> ligne de statut et en-tête Server"""
+    sock.sendall(f"HEAD / HTTP/1.0\r\nHost: {host}\r\nUser-Agent: check_port\r\n\r\n".encode())
+    lines = _recv_until(sock, b"\r\n\r\n").split("\r\n")
+    server = next((l for l in lines if l.lower().startswith("server:")), "")
+    return " | ".join(l for l in (lines[0], server) if l)
+
+def probe_redis(sock, host):
+    """PING -> +PONG (ou -NOAUTH si mot de passe)"""
+    sock.sendall(b"PING\r\n")
+    reply = _recv_until(sock, b"\r\n").strip()
+    return f"Redis {reply}" if reply else ""
+
+def probe_memcached(sock, host):
+    """version -> VERSION x.y.z"""
+    sock.sendall(b"version\r\n")
+    reply = _recv_until(sock, b"\r\n").strip()
+    return f"Memcached {reply}" if reply else ""
+
+def probe_tls(sock, host):
+    """ClientHello via ssl: version et suite négociées (certificat non vérifié)"""
+    import ssl
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    with ctx.wrap_socket(sock, server_hostname=host) as tls:
+        cipher = tls.cipher()
+        return f"TLS {tls.version()} {cipher[0] if cipher else ''}".strip()
+
+# Sondes actives indexées par nom de service (voir get_service_info)
+PROBES = {
+    "HTTP": probe_http,
+    "HTTP-Alt": probe_http,
+    "Elasticsearch": probe_http,
+    "Kibana": probe_http,
+    "Ollama-IA": probe_http,
+    "Webmin": probe_http,
+    "MongoDB-HTTP": probe_http,
+    "Redis": probe_redis,
+    "Memcached": probe_memcached,
+    "HTTPS": probe_tls,
+    "HTTPS-Alt": probe_tls,
+    "SMTPS": probe_tls,
+    "IMAPS": probe_tls,
+    "POP3S": probe_tls,
+    "cPanel-SSL": probe_tls,
+}
+
+def grab_banner(host, port, timeout=BANNER_TIMEOUT, connect_timeout=DEFAULT_TIMEOUT, probe=True):
+    """Se reconnecte à un port ouvert et retourne son banner ("" sinon).
+
+    Pour les services muets connus (HTTP, Redis, TLS, Memcached...), une sonde
+    protocolaire est envoyée avec une échéance PROBE_TIMEOUT; sinon on lit le
+    banner envoyé spontanément.
+    """
+    prober = PROBES.get(get_service_info(port)[0]) if probe else None
+    try:
+        with socket.create_connection((host, port), timeout=connect_timeout) as sock:
+            if prober:
+                sock.settimeout(PROBE_TIMEOUT)
+                try:
+                    return prober(sock, host).strip()
+                except Exception:
+                    return ""
+            sock.settimeout(timeout)
+            return sock.recv(512).decode(errors="ignore").strip()
+    except Exception:
+        return ""
+
+def with_banners(results, workers=BANNER_WORKERS, timeout=BANNER_TIMEOUT, probe_budget=PROBE_BUDGET):
+    """Second étage du pipeline: récupère les banners des ports ouverts en parallèle.
+
+    Les résultats fermés/filtrés passent immédiatement; les ports ouverts sont
+    produits dès que leur banner est arrivé, sans jamais freiner le balayage.
+    Le balayage est consommé par un thread dédié: ses résultats et les banners
+    terminés passent par une même file, un banner est donc livré sans attendre le
+    prochain résultat du balayage. Les sondes actives ne sont plus lancées après
+    `probe_budget` secondes de temps réel passées à sonder (au moins une sonde en
+    cours; lecture passive ensuite).
+    """
+    done = queue.SimpleQueue()
+    end = object()  # marqueur de fin du balayage: (end, banners demandés, erreur)
+    stop = threading.Event()
+    lock = threading.Lock()
+    probing = {"active": 0, "since": 0.0, "spent": 0.0}
+
+    def fetch(host, port):
+        active = get_service_info(port)[0] in PROBES
+        with lock:
+            now = time.monotonic()
+            spent = probing["spent"] + (now - probing["since"] if probing["active"] else 0.0)
+            probe = spent < probe_budget
+            if probe and active:
+                if not probing["active"]:
+                    probing["since"] = now
+                probing["active"] += 1
+        try:
+            return grab_banner(host, port, timeout, probe=probe)
+        finally:
+            if probe and active:
+                with lock:
+                    probing["active"] -= 1
+                    if not probing["active"]:
+                        probing["spent"] += time.monotonic() - probing["since"]
+
+    def deliver(fut, host, port):
+        text = "" if fut.cancelled() or fut.exception() else fut.result()
+        done.put((host, port, "open", text))
+
+    def sweep(ex):
+        # Seul ce thread itère (et ferme) le générateur du balayage
+        submitted, error = 0, None
+        try:
+            for result in results:
+                if stop.is_set():
+                    break
+                host, port, status, _ = result
+                if status == "open":
+                    fut = ex.submit(fetch, host, port)
+                    fut.add_done_callback(lambda f, h=host, p=port: deliver(f, h, p))
+                    submitted += 1
+                else:
+                    done.put(result)
+        except RuntimeError as e:
+            if not stop.is_set():  # pool arrêté: le consommateur a déjà abandonné
+                error = e
+        except BaseException as e:
+            error = e
+        finally:
+            results.close()
+            done.put((end, submitted, error))
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        threading.Thread(target=sweep, args=(ex,), daemon=True).start()
+        try:
+            delivered, submitted = 0, None
+            while submitted is None or delivered < submitted:
+                try:
+                    # Attente bornée: Ctrl-C reste traité normalement dans le thread principal
+                    item = done.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item[0] is end:
+                    _, submitted, error = item
+                    if error is not None:
+                        raise error
+                    continue
+                if item[2] == "open":
+                    delivered += 1
+                yield item
+        finally:
+            stop.set()
+
+def iter_jobs(target_ips, ports):
+    """Couples (hôte, port) entrelacés port par port, ports les plus probables d'abord"""
+    return ((host, port) for port in rank_ports(ports) for host in target_ips)
+
+def scan_jobs(jobs, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS, engine="threads", controller=None,
+              limiter=None):
+    """Scanne des couples (hôte, port) avec un moteur déjà résolu"""
+    if engine not in ENGINES:
+        raise ValueError(f"Moteur inconnu: {engine} (choix: auto, {', '.join(ENGINES)})")
+    results = ENGINES[engine](jobs, timeout, workers, controller, limiter)
+    if controller is None:
+        return results
+    return _observed(results, controller)
+
+def _scan_shard(target_ips, ports, shard, shards, timeout, workers, engine, adaptive, rate, done, out):
+    """Point d'entrée d'un processus: scanne une tranche sur `shards` des couples (hôte, port).
+
+    Les résultats remontent au parent par lots via `out` (None en fin de tranche).
+    `rate` est la part du débit global revenant à ce processus (None: illimité).
+    """
+    try:
+        num_jobs = max(1, len(target_ips) * len(ports) // shards)
+        workers, controller = plan_concurrency(engine, max(1, workers // shards), num_jobs, adaptive)
+        rtts = {ip: RttEstimator(initial=timeout) for ip in target_ips}
+        jobs = itertools.islice(iter_jobs(target_ips, ports), shard, None, shards)
+        if done is not None:
+            jobs = (job for job in jobs if job not in done)
+        batch = []
+        flushed = time.monotonic()
+        limiter = TokenBucket(rate) if rate else None
+        for result in scan_jobs(jobs, rtts, workers, engine, controller, limiter):
+            batch.append(result)
+            if len(batch) >= SHARD_BATCH or time.monotonic() - flushed > SHARD_FLUSH_INTERVAL:
+                out.put(batch)
+                batch = []
+                flushed = time.monotonic()
+        if batch:
+            out.put(batch)
+    except Exception as e:
+        out.put(("error", f"processus {shard}: {e}"))
+    finally:
+        out.put(None)
+
+def scan_targets_sharded(target_ips, ports, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS,
+                         engine=DEFAULT_ENGINE, processes=2, adaptive=True, banner=True, rate=None, done=None):
+    """Répartit les couples (hôte, port) entre `processes` processus (contourne le GIL).
+
+    `workers` est le budget global de départ, partagé entre les processus; chacun
+    a son propre moteur, ses estimateurs RTT et son contrôleur AIMD. Produit les
+    mêmes tuples (hôte, port, statut, banner) que scan_targets(); les banners sont
+    récupérés dans le processus parent. `rate` (connexions/s) est réparti également
+    entre les processus. Les couples présents dans `done` sont sautés.
+    """
+    results = _scan_targets_sharded(target_ips, ports, timeout, workers, engine, processes, adaptive, rate, done)
+    return with_banners(results) if banner else results
+
+def _scan_targets_sharded(target_ips, ports, timeout, workers, engine, processes, adaptive, rate=None, done=None):
+    target_ips = list(target_ips)
+    engine = resolve_engine(engine, len(ports) * len(target_ips))
+    if engine not in ENGINES:
+        raise ValueError(f"Moteur inconnu: {engine} (choix: auto, {', '.join(ENGINES)})")
+    ctx = multiprocessing.get_context()
+    out = ctx.Queue()
+    procs = [
+        ctx.Process(target=_scan_shard, daemon=True,
+                    args=(target_ips, ports, shard, processes, timeout, workers, engine, adaptive,
+                          rate / processes if rate else None, done, out))
+        for shard in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    running = len(procs)
+    try:
+        while running:
+            try:
+                item = out.get(timeout=1.0)
+            except queue.Empty:
+                # Un processus tué ne signale jamais sa fin
+                if not any(proc.is_alive() for proc in procs):
+                    break
+                continue
+            if item is None:
+                running -= 1
+            elif isinstance(item, tuple):
+                raise RuntimeError(item[1])
+            else:
+                yield from item
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+
+def _observed(results, controller):
+    """Alimente le contrôleur AIMD avec chaque résultat produit"""
+    try:
+        for result in results:
+            controller.record(result[2])
+            yield result
+    finally:
+        results.close()
+
+def scan_ports(target_ip, ports, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS, engine=DEFAULT_ENGINE,
+               controller=None, banner=True, limiter=None):
+    """Scanne une liste de ports avec le moteur choisi et produit des tuples (port, statut, banner)"""
+    results = scan_targets([target_ip], ports, timeout, workers, engine, controller, banner, limiter)
+    try:
+        for result in results:
+            yield result[1:]
+    finally:
+        results.close()
+
+# --- Points de reprise ---------------------------------------------------------
+CHECKPOINT_INTERVAL = 5.0
+
+def checkpoint_path(target, ports_arg, all_addresses=False):
+    """Fichier d'état par défaut, propre à la cible et à la sélection de ports"""
+    key = f"{target}|{ports_arg or 'common'}|{int(bool(all_addresses))}"
+    return os.path.join(os.getcwd(), f".check_port-{hashlib.sha1(key.encode()).hexdigest()[:12]}.state")
+
+def _port_ranges(ports):
+    """[1, 2, 3, 7] -> [[1, 3], [7, 7]] (ordre conservé)"""
+    ranges = []
+    for p in ports:
+        if ranges and p == ranges[-1][1] + 1:
+            ranges[-1][1] = p
+        else:
+            ranges.append([p, p])
+    return ranges
+
+def _expand_ranges(ranges):
+    if len(ranges) == 1:
+        return range(ranges[0][0], ranges[0][1] + 1)
+    return [p for a, b in ranges for p in range(a, b + 1)]
+
+class ScanCheckpoint:
+    """État de reprise d'un scan TCP.
+
+    Conserve la cible, les adresses résolues, le jeu de ports, un bitmap des couples
+    (hôte, port) terminés (indexés dans l'ordre de iter_jobs) et les ports ouverts
+    trouvés. `job in checkpoint` indique qu'un couple est déjà scanné; l'état est
+    réécrit (atomiquement) au plus toutes les CHECKPOINT_INTERVAL secondes. Si le
+    fichier ne peut pas être écrit, la sauvegarde est abandonnée mais le scan continue.
+    """
+
+    def __init__(self, path, target, resolved, ports):
+        self.path = path
+        self.target = target
+        self.resolved = [tuple(r) for r in resolved]
+        self.ports = ports
+        self.target_ips = [ip for _, ip in self.resolved]
+        self._host_index = {ip: i for i, ip in enumerate(self.target_ips)}
+        self._port_index = {p: i for i, p in enumerate(ports)}
+        self.done = bytearray((len(ports) * len(self.target_ips) + 7) // 8)
+        self.completed = 0
+        self.open_ports = {ip: [] for ip in self.target_ips}
+        self.saved = time.monotonic()
+        self.writable = True
+
+    def _index(self, host, port):
+        return self._port_index[port] * len(self.target_ips) + self._host_index[host]
+
+    def __contains__(self, job):
+        i = self._index(*job)
+        return bool(self.done[i >> 3] & (1 << (i & 7)))
+
+    def record(self, host, port, status, banner=""):
+        """Marque un couple comme terminé; sauvegarde si l'intervalle est écoulé"""
+        i = self._index(host, port)
+        if not self.done[i >> 3] & (1 << (i & 7)):
+            self.done[i >> 3] |= 1 << (i & 7)
+            self.completed += 1
+            if status == "open":
+                self.open_ports[host].append((port, banner))
+        if self.writable and time.monotonic() - self.saved >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def save(self):
+        """Écrit l'état sur disque; renvoie False (et désactive la sauvegarde) en cas d'échec"""
+        if not self.writable:
+            return False
+        state = {
+            "target": self.target,
+            "resolved": self.resolved,
+            "ports": _port_ranges(self.ports),
+            "completed": self.completed,
+            "done": base64.b64encode(zlib.compress(bytes(self.done))).decode(),
+            "open_ports": self.open_ports,
+        }
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.writable = False
+            print(f"⚠️  Point de reprise désactivé, impossible d'écrire {self.path}: {e}")
+            return False
+        self.saved = time.monotonic()
+        return True
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        cp = cls(path, state["target"], state["resolved"], _expand_ranges(state["ports"]))
+        done = zlib.decompress(base64.b64decode(state["done"]))
+        if len(done) != len(cp.done):
+            raise ValueError("bitmap incohérent avec le jeu de ports")
+        cp.done[:] = done
+        cp.completed = state["completed"]
+        for ip, found in state["open_ports"].items():
+            cp.open_ports[ip] = [tuple(x) for x in found]
+        return cp
+
+    def remove(self):
+        for path in (self.path, self.path + ".tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# --- Balayage UDP -------------------------------------------------------------
+UDP_TIMEOUT = 1.0
+UDP_RATE = 500
+UDP_RETRIES = 1
+UDP_BATCH = 64
+UDP_COMMON_PORTS = [53,67,68,69,123,137,138,161,162,500,514,520,1900,4500,5353]
+
+# Charges utiles protocolaires: un port UDP ne répond en général qu'à une requête valide
+UDP_PAYLOADS = {
+    # DNS: requête NS pour la racine
+    53: b"\x12\x34\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x02\x00\x01",
+    # TFTP: lecture d'un fichier inexistant (un paquet d'erreur prouve l'ouverture);
+    # le serveur répond depuis un nouveau port (TID, RFC 1350), voir UDP_REPLY_FROM_NEW_PORT
+    69: b"\x00\x01check_port\x00octet\x00",
+    # NTP: requête client (v3, mode 3)
+    123: b"\x1b" + b"\x00" * 47,
+    # SNMP v1 GetRequest sysDescr.0, communauté 'public'
+    161: (b"\x30\x26\x02\x01\x00\x04\x06public\xa0\x19\x02\x01\x01\x02\x01\x00\x02\x01\x00"
+          b"\x30\x0e\x30\x0c\x06\x08\x2b\x06\x01\x02\x01\x01\x01\x00\x05\x00"),
+    # NetBIOS: requête de statut de nom (*)
+    137: (b"\x80\xf0\x00\x10\x00\x01\x00\x00\x00\x00\x00\x00\x20CKAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+          b"\x00\x00\x21\x00\x01"),
+    # SSDP: découverte UPnP
+    1900: b"M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\nMAN: \"ssdp:discover\"\r\nMX: 1\r\nST: ssdp:all\r\n\r\n",
+    # mDNS: même requête que DNS
+    5353: b"\x12\x34\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x02\x00\x01",
+}
+
+# Protocoles dont la réponse vient d'un port source éphémère: port -> début attendu de la réponse
+# (TFTP: paquet DATA ou ERROR); elle est rattachée à la sonde en attente du même hôte
+UDP_REPLY_FROM_NEW_PORT = {
+    69: (b"\x00\x03", b"\x00\x05"),
+}
+
+# Linux: IP_RECVERR fait remonter les ICMP « port unreachable » sur un socket non connecté,
+# avec l'adresse de destination d'origine -> un même socket sert pour tous les ports
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+MSG_ERRQUEUE = getattr(socket, "MSG_ERRQUEUE", 0x2000)
+SO_EE_ORIGIN_ICMP = 2
+SO_EE_ORIGIN_ICMP6 = 3
+
+def describe_udp_reply(data):
+    """Résumé lisible d'une réponse UDP (texte imprimable ou taille)"""
+    text = "".join(chr(b) if 32 <= b < 127 else " " for b in data)
+    text = " ".join(text.split())
+    if len(text) >= 4:
+        return text[:80]
+    return f"{len(data)} octets"
+
+def _udp_socket(family):
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    if "linux" in platform.system().lower():
+        try:
+            if family == socket.AF_INET6:
+                sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVERR, 1)
+            else:
+                sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+        except OSError:
+            pass
+    return sock
+
+def _udp_errors(sock):
+    """Vide la file d'erreurs ICMP: produit ((hôte, port), statut)"""
+    while True:
+        try:
+            _, ancdata, _, addr = sock.recvmsg(512, 512, MSG_ERRQUEUE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            return
+        for _, _, cdata in ancdata:
+            if len(cdata) < 16 or not addr:
+                continue
+            ee_errno, origin, icmp_type, icmp_code = struct.unpack("=IBBB", cdata[:7])
+            if origin not in (SO_EE_ORIGIN_ICMP, SO_EE_ORIGIN_ICMP6):
+                continue
+            # ECONNREFUSED = port unreachable; les autres codes (admin prohibited...) -> filtré
+            status = "closed" if ee_errno == errno.ECONNREFUSED else "filtered"
+            yield (addr[0], addr[1]), status
+
+def _udp_reply_owner(host, data, waiting):
+    """Sonde en attente sur `host` à laquelle rattacher une réponse venue d'un autre port"""
+    for port, prefixes in UDP_REPLY_FROM_NEW_PORT.items():
+        if (host, port) in waiting and data.startswith(prefixes):
+            return (host, port)
+    return None
+
+def scan_targets_udp(target_ips, ports, timeout=UDP_TIMEOUT, rate=UDP_RATE, retries=UDP_RETRIES, payloads=None):
+    """Balaye des ports UDP et produit des tuples (hôte, port, statut, info).
+
+    Un seul socket par famille d'adresses envoie des requêtes protocolaires
+    (UDP_PAYLOADS, datagramme vide sinon) au rythme de `rate` paquets/s; les réponses
+    sont rattachées au port via l'adresse source (ou, pour TFTP qui répond depuis un
+    nouveau port, à la sonde en attente du même hôte), les ICMP « port unreachable » via
+    la file d'erreurs (Linux). Statuts: 'open' (réponse), 'closed' (ICMP),
+    'filtered' avec l'info 'open|filtered' (aucune réponse après `retries` renvois).
+    Hors Linux les ICMP ne sont pas vus: les ports fermés apparaissent open|filtered.
+    `payloads` (port -> octets) remplace UDP_PAYLOADS, p. ex. pour des serveurs de test.
+    """
+    target_ips = list(target_ips)
+    payloads = UDP_PAYLOADS if payloads is None else payloads
+    sel = selectors.DefaultSelector()
+    socks = {}
+    job_iter = iter_jobs(target_ips, ports)
+    retry = collections.deque()
+    waiting = {}    # (hôte, port) -> [échéance, renvois restants]
+    deadlines = []  # tas (échéance, (hôte, port)), entrées périmées ignorées
+    interval = 1.0 / rate if rate else 0.0
+    next_send = time.monotonic()
+    exhausted = False
+
+    def sock_for(host):
+        family = family_for(host)
+        if family not in socks:
+            socks[family] = _udp_socket(family)
+            sel.register(socks[family], selectors.EVENT_READ)
+        return socks[family]
+
+    try:
+        while True:
+            # Envoi cadencé par lots de UDP_BATCH, sans rattrapage en rafale après une pause
+            now = time.monotonic()
+            sent = 0
+            while now >= next_send and sent < UDP_BATCH:
+                if retry:
+                    job, tries = retry.popleft()
+                elif not exhausted:
+                    job = next(job_iter, None)
+                    tries = retries
+                    if job is None:
+                        exhausted = True
+                        break
+                else:
+                    break
+                host, port = job
+                try:
+                    sock_for(host).sendto(payloads.get(port, b""), (host, port))
+                except (BlockingIOError, InterruptedError):
+                    # Tampon d'émission plein: on réessaie au prochain tour
+                    retry.appendleft((job, tries))
+                    break
+                except OSError as e:
+                    if e.errno == errno.ECONNREFUSED:
+                        retry.appendleft((job, tries))
+                        continue
+                    waiting.pop(job, None)
+                    yield (host, port, "filtered", str(e))
+                    continue
+                deadline = now + timeout
+                waiting[job] = [deadline, tries]
+                heapq.heappush(deadlines, (deadline, job))
+                next_send = max(next_send, now - interval) + interval
+                sent += 1
+            if exhausted and not retry and not waiting:
+                break
+
+            wait = deadlines[0][0] - now if deadlines else timeout
+            if sent >= UDP_BATCH:
+                wait = 0.0
+            elif retry or not exhausted:
+                wait = min(wait, next_send - now)
+            for key, _ in sel.select(max(0.0, wait)):
+                sock = key.fileobj
+                for job, status in _udp_errors(sock):
+                    if waiting.pop(job, None) is not None:
+                        yield (job[0], job[1], status, "" if status == "closed" else "icmp")
+                while True:
+                    try:
+                        data, addr = sock.recvfrom(65535)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError:
+                        # Erreur ICMP en attente: déjà traitée via la file d'erreurs
+                        break
+                    job = (addr[0], addr[1])
+                    if job not in waiting:
+                        job = _udp_reply_owner(addr[0], data, waiting)
+                    if waiting.pop(job, None) is not None:
+                        yield (job[0], job[1], "open", describe_udp_reply(data))
+
+            # Échéances dépassées -> renvoi puis open|filtered
+            now = time.monotonic()
+            while deadlines and deadlines[0][0] <= now:
+                deadline, job = heapq.heappop(deadlines)
+                state = waiting.get(job)
+                if state is None or state[0] != deadline:
+                    continue
+                del waiting[job]
+                if state[1] > 0:
+                    retry.append((job, state[1] - 1))
+                else:
+                    yield (job[0], job[1], "filtered", "open|filtered")
+    finally:
+        sel.close()
+        for sock in socks.values():
+            sock.close()
+
+# --- Inventaire local (/proc/net) ----------------------------------------------
+PROC_NET_TCP = ("/proc/net/tcp", "/proc/net/tcp6")
+TCP_LISTEN = "0A"
+
+def _proc_address(field):
+    """'0100007F:1F90' -> ('127.0.0.1', 8080); adresses stockées en mots 32 bits petit-boutistes"""
+    ip_hex, port_hex = field.split(":")
+    raw = bytes.fromhex(ip_hex)
+    raw = b"".join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    ip = ipaddress.ip_address(raw)
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return str(ip), int(port_hex, 16)
+
+def read_proc_listeners():
+    """Sockets TCP en écoute d'après le noyau: liste de (adresse locale, port, inode).
+
+    Lit /proc/net/tcp et /proc/net/tcp6 en une passe; lève OSError hors Linux.
+    """
+    listeners = []
+    found = False
+    for path in PROC_NET_TCP:
+        try:
+            f = open(path, encoding="ascii")
+        except OSError:
+            continue
+        found = True
+        with f:
+            next(f, None)  # entête
+            for line in f:
+                fields = line.split()
+                if len(fields) < 10 or fields[3] != TCP_LISTEN:
+                    continue
+                addr, port = _proc_address(fields[1])
+                listeners.append((addr, port, int(fields[9])))
+    if not found:
+        raise OSError("/proc/net/tcp indisponible (inventaire local réservé à Linux)")
+    return listeners
+
+def _listener_accepts(addr, host):
+    """Un socket lié à `addr` accepte-t-il les connexions vers `host` ?"""
+    if addr == "0.0.0.0":
+        return ":" not in host
+    if addr == "::":
+        return True  # double pile par défaut (bindv6only=0); --verify tranche au besoin
+    return addr == host
+
+def scan_local(target_ips, ports, verify=False, timeout=DEFAULT_TIMEOUT, banner=True, done=None):
+    """Inventaire local: déduit les ports ouverts des sockets en écoute au lieu de se connecter.
+
+    Produit les mêmes tuples (hôte, port, statut, banner) que scan_targets() pour des
+    cibles locales; tous les ports demandés sont couverts ('open' ou 'closed').
+    Avec verify=True les ports en écoute sont confirmés par une connexion (pare-feu
+    local, socket fermé entre-temps). Lève OSError si /proc/net n'est pas lisible.
+    """
+    target_ips = list(target_ips)
+    listeners = read_proc_listeners()
+    listening = {host: {port for addr, port, _ in listeners if _listener_accepts(addr, host)}
+                 for host in target_ips}
+
+    def inventory():
+        to_verify = []
+        for host, port in iter_jobs(target_ips, ports):
+            if done is not None and (host, port) in done:
+                continue
+            if port not in listening[host]:
+                yield (host, port, "closed", "")
+            elif verify:
+                to_verify.append((host, port))
+            else:
+                yield (host, port, "open", "")
+        if to_verify:
+            yield from scan_jobs(to_verify, timeout, min(len(to_verify), DEFAULT_WORKERS), "threads")
+
+    results = inventory()
+    return with_banners(results) if banner else results
+
+LOCAL_IPS_TTL = 30.0
+
+def _fib_trie_local():
+    """Adresses IPv4 locales du noyau (/proc/net/fib_trie, entrées 'host LOCAL').
+
+    Retourne (adresses, réseaux) : un préfixe plus court que /32 (127.0.0.0/8) est
+    local en entier.
+    """
+    ips, nets = set(), set()
+    last = None
+    with open("/proc/net/fib_trie", encoding="ascii") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("|--"):
+                last = line[3:].strip()
+            elif last and line.endswith("host LOCAL"):
+                prefix = int(line.split()[0].lstrip("/"))
+                if prefix == 32:
+                    ips.add(last)
+                else:
+                    nets.add(ipaddress.ip_network(f"{last}/{prefix}", strict=False))
+    return ips, nets
+
+def _if_inet6_local():
+    """Adresses IPv6 des interfaces (/proc/net/if_inet6)"""
+    ips = set()
+    with open("/proc/net/if_inet6", encoding="ascii") as f:
+        for line in f:
+            fields = line.split()
+            if fields:
+                ips.add(str(ipaddress.ip_address(bytes.fromhex(fields[0]))))
+    return ips
+
+def _resolver_local_ips():
+    """Repli hors Linux: adresses du nom d'hôte et adresse source de la route par défaut"""
+    ips = set()
     try:
         hostname = socket.gethostname()
         for af, socktype, proto, canonname, sa in socket.getaddrinfo(hostname, None):
@@ -71,16 +1441,81 @@ def get_local_ips():
         pass
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
+        s.connect(("8.8.8.8", 80))  # UDP: aucun paquet n'est émis
         ips.add(s.getsockname()[0])
         s.close()
     except Exception:
         pass
     return ips
 
+class LocalAddresses:
+    """Adresses des interfaces locales, lues dans le noyau et mises en cache `ttl` secondes.
+
+    Sous Linux: /proc/net/fib_trie (IPv4) et /proc/net/if_inet6 (IPv6), sans DNS
+    ni réseau; ailleurs, repli sur le nom d'hôte. is_local() est une recherche
+    dans un ensemble (plus les préfixes locaux comme 127.0.0.0/8).
+    """
+
+    def __init__(self, ttl=LOCAL_IPS_TTL):
+        self.ttl = ttl
+        self._ips = None
+        self._nets = ()
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        ips = {"127.0.0.1", "::1", "localhost"}
+        nets = set()
+        kernel = False
+        try:
+            v4, nets = _fib_trie_local()
+            ips |= v4
+            kernel = True
+        except (OSError, ValueError):
+            pass
+        try:
+            ips |= _if_inet6_local()
+            kernel = True
+        except (OSError, ValueError):
+            pass
+        if not kernel:
+            ips |= _resolver_local_ips()
+        return ips, tuple(nets)
+
+    def _current(self):
+        with self._lock:
+            if self._ips is None or time.monotonic() - self._loaded > self.ttl:
+                self._ips, self._nets = self._load()
+                self._loaded = time.monotonic()
+            return self._ips, self._nets
+
+    def addresses(self):
+        return set(self._current()[0])
+
+    def is_local(self, host):
+        ips, nets = self._current()
+        host = host.split("%", 1)[0]  # fe80::1%eth0
+        if host in ips:
+            return True
+        try:
+            ip = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return str(ip) in ips or any(ip in net for net in nets if net.version == ip.version)
+
+    def invalidate(self):
+        with self._lock:
+            self._ips = None
+
+LOCAL_ADDRESSES = LocalAddresses()
+
+def get_local_ips():
+    """Récupère toutes les adresses IP locales de la machine (cache, voir LocalAddresses)"""
+    return LOCAL_ADDRESSES.addresses()
+
 def is_local_target_strict(target_ip):
     """Vérifie si la cible correspond exactement à une interface locale"""
-    return target_ip in get_local_ips()
+    return LOCAL_ADDRESSES.is_local(target_ip)
 
 def find_pids_linux(port):
     """Trouve les PID des processus utilisant un port donné sous Linux"""
@@ -99,7 +1534,6 @@ def find_pids_linux(port):
         for line in out.splitlines():
             if f":{port} " in line or f":{port}\n" in line or f":{port}\t" in line:
                 if "pid=" in line:
-                    import re
                     m = re.search(r"pid=(\d+),", line)
                     if m:
                         pids.add(int(m.group(1)))
@@ -107,116 +1541,282 @@ def find_pids_linux(port):
         pass
     return pids
 
+def parse_netstat(text):
+    """Analyse une sortie `netstat -ano` (Windows) -> {port local: {PIDs}} des sockets TCP en écoute.
+
+    Le port local est comparé exactement (':80' ne correspond plus à ':8080'), en IPv4
+    (0.0.0.0:135) comme en IPv6 ([::]:445, [fe80::1%4]:139). Une ligne TCP est en
+    écoute quand son adresse distante est nulle (0.0.0.0:0, [::]:0), ce qui ne dépend
+    pas de la langue de Windows (LISTENING, ABHÖREN...).
+    """
+    ports = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 4 or parts[0].upper() != "TCP":
+            continue
+        local, remote = parts[1], parts[2]
+        if ":" not in local or remote.rsplit(":", 1)[-1] != "0":
+            continue
+        try:
+            port = int(local.rsplit(":", 1)[1])
+            pid = int(parts[-1])
+        except ValueError:
+            continue
+        ports.setdefault(port, set()).add(pid)
+    return ports
+
+def _netstat_snapshot():
+    try:
+        return subprocess.check_output(["netstat", "-ano"], stderr=subprocess.DEVNULL).decode(errors="ignore")
+    except (OSError, subprocess.SubprocessError) as e:
+        raise OSError(f"netstat indisponible: {e}") from e
+
 def find_pids_windows(port):
-    """Trouve les PID des processus utilisant un port donné sous Windows"""
-    pids = set()
+    """Trouve les PID des processus utilisant un port donné sous Windows (instantané netstat dédié)"""
     try:
-        out = subprocess.check_output(["netstat", "-ano"], stderr=subprocess.DEVNULL).decode(errors="ignore")
-        for line in out.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            # sauter l'entête (Proto Local Address Foreign Address State PID)
-            if line.lower().startswith("proto"):
+        return parse_netstat(_netstat_snapshot()).get(port, set())
+    except OSError:
+        return set()
+
+def _proc_port_pids():
+    """{port: {PIDs}} depuis /proc: inodes en écoute (/proc/net/tcp{,6}) et 'socket:[inode]' de /proc/<pid>/fd"""
+    inode_ports = {}
+    for _, port, inode in read_proc_listeners():
+        inode_ports.setdefault(inode, set()).add(port)
+    ports = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            fds = os.scandir(f"/proc/{entry.name}/fd")
+        except OSError:
+            continue  # processus terminé ou d'un autre utilisateur
+        with fds:
+            for fd in fds:
+                try:
+                    link = os.readlink(fd.path)
+                except OSError:
+                    continue
+                if link.startswith("socket:["):
+                    for port in inode_ports.get(int(link[8:-1]), ()):
+                        ports.setdefault(port, set()).add(int(entry.name))
+    return ports
+
+def _pid_index_supported():
+    plat = platform.system().lower()
+    return "windows" in plat or ("linux" in plat and os.path.isdir("/proc/net"))
+
+class PortPidIndex:
+    """Index port -> PIDs des sockets TCP en écoute, construit en une passe.
+
+    Sous Linux: /proc (voir _proc_port_pids); sous Windows: un seul `netstat -ano`
+    analysé par parse_netstat(). Chaque recherche est ensuite en O(1); l'index est
+    construit au premier usage puis figé jusqu'à refresh().
+    Sans root/admin, les processus des autres utilisateurs restent invisibles (comme lsof).
+    """
+
+    def __init__(self):
+        self._ports = None
+        self.built = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reconstruit l'index; lève OSError si la source (/proc, netstat) n'est pas disponible"""
+        if "windows" in platform.system().lower():
+            ports = parse_netstat(_netstat_snapshot())
+        else:
+            ports = _proc_port_pids()
+        with self._lock:
+            self._ports = ports
+            self.built = time.monotonic()
+
+    def pids(self, port):
+        """PIDs à l'écoute sur `port` (construit l'index si nécessaire)"""
+        if self._ports is None:
+            self.refresh()
+        with self._lock:
+            return set(self._ports.get(port, ()))
+
+PID_INDEX = PortPidIndex()
+
+def refresh_pid_index():
+    """Force la relecture de la table des sockets (après un arrêt de service, un kill...)"""
+    if _pid_index_supported():
+        try:
+            PID_INDEX.refresh()
+        except OSError:
+            pass
+
+def find_pids(port):
+    """PIDs à l'écoute sur un port: index partagé (/proc ou netstat), sinon lsof/ss"""
+    plat = platform.system().lower()
+    if _pid_index_supported():
+        try:
+            return PID_INDEX.pids(port)
+        except OSError:
+            pass
+    if "linux" in plat or "darwin" in plat:
+        return find_pids_linux(port)
+    if "windows" in plat:
+        return find_pids_windows(port)
+    return set()
+
+# Services connus: port -> (nom affiché, service systemd, paquet)
+SERVICE_MAP = {
+    20: ("FTP-data", "ftp", "vsftpd"),
+    21: ("FTP", "vsftpd", "vsftpd"),
+    22: ("SSH", "ssh", "openssh-server"),
+    23: ("TELNET", "telnet", None),
+    25: ("SMTP", "postfix", "postfix"),
+    53: ("DNS", "bind9", "bind9"),
+    67: ("DHCP-server", "isc-dhcp-server", "isc-dhcp-server"),
+    68: ("DHCP-client", None, None),
+    69: ("TFTP", "tftpd-hpa", "tftpd-hpa"),
+    80: ("HTTP", "apache2", "apache2"),
+    88: ("Kerberos", "krb5-kdc", "krb5-kdc"),
+    110: ("POP3", "dovecot", "dovecot"),
+    111: ("rpcbind", "rpcbind", "rpcbind"),
+    123: ("NTP", "ntp", "ntp"),
+    135: ("MS-RPC", None, None),
+    139: ("NetBIOS-SSN", None, None),
+    143: ("IMAP", "dovecot", "dovecot"),
+    161: ("SNMP", "snmpd", "snmpd"),
+    389: ("LDAP", "slapd", "slapd"),
+    443: ("HTTPS", "nginx", "nginx"),
+    445: ("SMB", "smbd", "smbd"),
+    465: ("SMTPS", "postfix", "postfix"),
+    514: ("syslog", "rsyslog", "rsyslog"),
+    631: ("CUPS-Imprimante", "cups", "cups"),
+    993: ("IMAPS", "dovecot", "dovecot"),
+    995: ("POP3S", "dovecot", "dovecot"),
+    1080: ("SOCKS", None, None),
+    1433: ("MSSQL", None, None),
+    1521: ("Oracle", None, None),
+    2049: ("NFS", "nfs-kernel-server", "nfs-kernel-server"),
+    2082: ("cPanel", None, None),
+    2083: ("cPanel-SSL", None, None),
+    3306: ("MySQL", "mysql", "mysql"),
+    3389: ("RDP", None, None),
+    3690: ("Subversion", None, None),
+    4444: ("Metasploit", None, None),
+    4662: ("eDonkey", None, None),
+    5000: ("UPnP/Dev", None, None),
+    5001: ("iperf", None, None),
+    5432: ("PostgreSQL", "postgresql", "postgresql"),
+    5601: ("Kibana", None, None),
+    5900: ("VNC", None, None),
+    6000: ("X11", None, None),
+    6379: ("Redis", "redis-server", "redis-server"),
+    6667: ("IRC", None, None),
+    6881: ("BitTorrent", None, None),
+    8000: ("HTTP-Alt", None, None),
+    8008: ("HTTP-Alt", None, None),
+    8080: ("HTTP-Alt", "tomcat", "tomcat"),
+    8443: ("HTTPS-Alt", None, None),
+    9000: ("Sonar/Php-FPM", None, None),
+    9200: ("Elasticsearch", "elasticsearch", "elasticsearch"),
+    9300: ("Elasticsearch-TCP", None, None),
+    10000: ("Webmin", "webmin", "webmin"),
+    11211: ("Memcached", "memcached", "memcached"),
+    11434: ("Ollama-IA", "ollama", "ollama"),
+    25565: ("Minecraft", None, None),
+    27015: ("Game-Server", None, None),
+    27017: ("MongoDB", "mongod", "mongodb"),
+    27018: ("MongoDB-Alt", None, None),
+    28017: ("MongoDB-HTTP", None, None),
+    50070: ("HDFS Namenode", None, None),
+}
+
+DYNAMIC_PORTS = range(32768, 65536)
+UNKNOWN_SERVICE = ("Service-Inconnu", None, None)
+DYNAMIC_SERVICE = ("Port-Dynamique", None, None)
+
+def _build_service_table():
+    """Tableau de 65536 références vers des enregistrements partagés (aucune allocation à la lecture)"""
+    table = [UNKNOWN_SERVICE] * 65536
+    table[DYNAMIC_PORTS.start:] = [DYNAMIC_SERVICE] * len(DYNAMIC_PORTS)
+    for port, record in SERVICE_MAP.items():
+        if port not in DYNAMIC_PORTS:
+            table[port] = record
+    return table
+
+SERVICE_TABLE = _build_service_table()
+
+def load_services(path="/etc/services"):
+    """Complète SERVICE_TABLE depuis un fichier /etc/services ou nmap-services.
+
+    Lignes 'nom port/proto ...' (seul tcp est retenu); les ports déjà connus et la
+    plage dynamique sont conservés. Retourne le nombre de ports ajoutés.
+    """
+    records = {}
+    added = 0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            fields = line.split("#", 1)[0].split()
+            if len(fields) < 2 or "/" not in fields[1]:
                 continue
-            parts = line.split()
-            if len(parts) < 2:
+            port, proto = fields[1].split("/", 1)
+            if proto != "tcp" or not port.isdigit():
                 continue
-            # Le PID est normalement la dernière colonne
-            pid = parts[-1]
-            # Rechercher une colonne contenant le port local (prise en charge IPv4/IPv6)
-            try:
-                for col in parts[:-1]:
-                    if f":{port}" in col or col.endswith(f".{port}"):
-                        try:
-                            pids.add(int(pid))
-                        except:
-                            pass
-                        break
-            except Exception:
-                # Ne pas laisser une ligne foireuse casser tout
+            port = int(port)
+            if port > 65535 or SERVICE_TABLE[port] is not UNKNOWN_SERVICE or fields[0] == "unknown":
                 continue
-    except Exception:
-        pass
-    return pids
+            name = sys.intern(fields[0])
+            SERVICE_TABLE[port] = records.setdefault(name, (name, None, None))
+            added += 1
+    return added
 
 def get_service_info(port, pid=None):
-    """Détecte le type de service et retourne des infos utiles"""
-    service_map = {
-        20: ("FTP-data", "ftp", "vsftpd"),
-        21: ("FTP", "vsftpd", "vsftpd"),
-        22: ("SSH", "ssh", "openssh-server"),
-        23: ("TELNET", "telnet", None),
-        25: ("SMTP", "postfix", "postfix"),
-        53: ("DNS", "bind9", "bind9"),
-        67: ("DHCP-server", "isc-dhcp-server", "isc-dhcp-server"),
-        68: ("DHCP-client", None, None),
-        69: ("TFTP", "tftpd-hpa", "tftpd-hpa"),
-        80: ("HTTP", "apache2", "apache2"),
-        88: ("Kerberos", "krb5-kdc", "krb5-kdc"),
-        110: ("POP3", "dovecot", "dovecot"),
-        111: ("rpcbind", "rpcbind", "rpcbind"),
-        123: ("NTP", "ntp", "ntp"),
-        135: ("MS-RPC", None, None),
-        139: ("NetBIOS-SSN", None, None),
-        143: ("IMAP", "dovecot", "dovecot"),
-        161: ("SNMP", "snmpd", "snmpd"),
-        389: ("LDAP", "slapd", "slapd"),
-        443: ("HTTPS", "nginx", "nginx"),
-        445: ("SMB", "smbd", "smbd"),
-        465: ("SMTPS", "postfix", "postfix"),
-        514: ("syslog", "rsyslog", "rsyslog"),
-        631: ("CUPS-Imprimante", "cups", "cups"),
-        993: ("IMAPS", "dovecot", "dovecot"),
-        995: ("POP3S", "dovecot", "dovecot"),
-        1080: ("SOCKS", None, None),
-        1433: ("MSSQL", None, None),
-        1521: ("Oracle", None, None),
-        2049: ("NFS", "nfs-kernel-server", "nfs-kernel-server"),
-        2082: ("cPanel", None, None),
-        2083: ("cPanel-SSL", None, None),
-        3306: ("MySQL", "mysql", "mysql"),
-        3389: ("RDP", None, None),
-        3690: ("Subversion", None, None),
-        4444: ("Metasploit", None, None),
-        4662: ("eDonkey", None, None),
-        5000: ("UPnP/Dev", None, None),
-        5001: ("iperf", None, None),
-        5432: ("PostgreSQL", "postgresql", "postgresql"),
-        5601: ("Kibana", None, None),
-        5900: ("VNC", None, None),
-        6000: ("X11", None, None),
-        6379: ("Redis", "redis-server", "redis-server"),
-        6667: ("IRC", None, None),
-        6881: ("BitTorrent", None, None),
-        8000: ("HTTP-Alt", None, None),
-        8008: ("HTTP-Alt", None, None),
-        8080: ("HTTP-Alt", "tomcat", "tomcat"),
-        8443: ("HTTPS-Alt", None, None),
-        9000: ("Sonar/Php-FPM", None, None),
-        9200: ("Elasticsearch", "elasticsearch", "elasticsearch"),
-        9300: ("Elasticsearch-TCP", None, None),
-        10000: ("Webmin", "webmin", "webmin"),
-        11211: ("Memcached", "memcached", "memcached"),
-        11434: ("Ollama-IA", "ollama", "ollama"),
-        25565: ("Minecraft", None, None),
-        27015: ("Game-Server", None, None),
-        27017: ("MongoDB", "mongod", "mongodb"),
-        27018: ("MongoDB-Alt", None, None),
-        28017: ("MongoDB-HTTP", None, None),
-        50070: ("HDFS Namenode", None, None),
-    }
-    
-    # Ports dynamiques/éphémères (plages communes)
-    if 32768 <= port <= 65535:
-        return ("Port-Dynamique", None, None)
-    
-    if port in service_map:
-        return service_map[port]
-    return ("Service-Inconnu", None, None)
+    """Détecte le type de service et retourne des infos utiles (nom, service systemd, paquet)"""
+    if 0 <= port < 65536:
+        return SERVICE_TABLE[port]
+    return UNKNOWN_SERVICE
 
-def get_process_details(pid):
-    """Récupère les détails d'un processus donné"""
+PROCESS_CACHE_TTL = 30.0
+PROCESS_CACHE_SIZE = 1024
+
+def _unknown_process():
+    return {"name": "unknown", "username": "unknown", "cmdline": "unknown", "status": "unknown"}
+
+def _proc_start_time(pid):
+    """Date de démarrage (ticks depuis le boot, champ 22 de /proc/<pid>/stat) ou None"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+        # comm peut contenir des espaces ou des parenthèses: on repart de la dernière ')'
+        return int(data.rsplit(b")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+def _read_proc_process(pid):
+    """Détails d'un processus lus dans /proc/<pid>/{comm,cmdline,status}, sans fork"""
+    base = f"/proc/{pid}"
+    try:
+        with open(f"{base}/comm", encoding="utf-8", errors="replace") as f:
+            name = f.read().strip()
+        with open(f"{base}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ").decode(errors="ignore").strip()
+        status, uid = "unknown", None
+        with open(f"{base}/status", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.startswith("State:"):
+                    status = line.split("(", 1)[-1].rstrip(")\n")
+                elif line.startswith("Uid:"):
+                    uid = int(line.split()[1])
+                    break
+    except (OSError, ValueError):
+        return None
+    username = "unknown"
+    if uid is not None:
+        try:
+            import pwd
+            username = pwd.getpwuid(uid).pw_name
+        except Exception:
+            username = str(uid)
+    return {"name": name, "username": username, "cmdline": cmdline or f"[{name}]", "status": status}
+
+def _fetch_process_details(pid):
+    """Détails via psutil, sinon `ps` (plateformes sans /proc)"""
     try:
         import psutil
         process = psutil.Process(pid)
@@ -243,19 +1843,78 @@ def get_process_details(pid):
                     }
         except Exception:
             pass
-    return {"name": "unknown", "username": "unknown", "cmdline": "unknown", "status": "unknown"}
+    except Exception:
+        pass  # processus disparu ou inaccessible
+    return _unknown_process()
+
+class ProcessCache:
+    """Cache LRU des détails de processus, clé (PID, date de démarrage).
+
+    La date de démarrage (lue dans /proc/<pid>/stat) détecte la réutilisation
+    d'un PID; hors Linux elle vaut None et seule la durée de vie `ttl` s'applique.
+    Au plus `maxsize` entrées; les processus inconnus ne sont pas mis en cache.
+    """
+
+    def __init__(self, ttl=PROCESS_CACHE_TTL, maxsize=PROCESS_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()  # pid -> (démarrage, lu à, infos)
+        self._lock = threading.Lock()
+
+    def get_many(self, pids):
+        """Retourne {pid: infos}; les absents du cache sont lus en une passe sur /proc"""
+        now = time.monotonic()
+        found = {}
+        missing = []
+        starts = {pid: _proc_start_time(pid) for pid in pids}
+        with self._lock:
+            for pid, start in starts.items():
+                entry = self._entries.get(pid)
+                if entry and entry[0] == start and now - entry[1] < self.ttl:
+                    self._entries.move_to_end(pid)
+                    found[pid] = dict(entry[2])
+                else:
+                    missing.append(pid)
+        fetched = {}
+        for pid in missing:
+            info = _read_proc_process(pid) if starts[pid] is not None else None
+            fetched[pid] = info or _fetch_process_details(pid)
+        with self._lock:
+            for pid, info in fetched.items():
+                found[pid] = dict(info)
+                if info["name"] == "unknown":
+                    self._entries.pop(pid, None)
+                    continue
+                self._entries[pid] = (starts[pid], now, info)
+                self._entries.move_to_end(pid)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+PROCESS_CACHE = ProcessCache()
+
+def get_processes_details(pids):
+    """Détails de plusieurs processus en un appel: {pid: {name, username, cmdline, status}}"""
+    return PROCESS_CACHE.get_many(list(pids))
+
+def get_process_details(pid):
+    """Récupère les détails d'un processus donné (mis en cache, voir ProcessCache)"""
+    return get_processes_details([pid])[pid]
 
 def get_pids_for_port(port):
-    """Retourne une liste d'infos procesus (pid,name,user,cmd) pour un port donné (best-effort)."""
-    plat = platform.system().lower()
-    pids = set()
-    if "linux" in plat or "darwin" in plat:
-        pids = find_pids_linux(port)
-    elif "windows" in plat:
-        pids = find_pids_windows(port)
+    """Retourne une liste d'infos procesus (pid,name,user,cmd) pour un port donné (best-effort).
+
+    S'appuie sur l'index partagé (PID_INDEX): appeler refresh_pid_index() pour des données fraîches.
+    """
+    pids = find_pids(port)
+    details = get_processes_details(pids)
     infos = []
     for pid in sorted(pids):
-        info = get_process_details(pid)
+        info = details[pid]
         infos.append({
             "pid": pid,
             "name": info.get("name", "unknown"),
@@ -299,8 +1958,9 @@ def kill_pids(pids, port=None):
     
     service_name, service_cmd, _ = get_service_info(port) if port else ("Unknown", None, None)
     
+    details = get_processes_details(pids)
     for pid in pids:
-        process_info = get_process_details(pid)
+        process_info = details[pid]
         print(f"    🔍 PID {pid}: {process_info['name']} (utilisateur: {process_info['username']})")
         
         try:
@@ -345,53 +2005,278 @@ def suggest_remote_commands(target, ports, remote_os_hint=None):
     print("\nNote: Bloquer via pare-feu est préférable à tuer des services critiques.")
     print("--- Fin des commandes distantes ---\n")
 
-def analyze_port(port):
-    """Analyse un port spécifique et retourne des informations détaillées"""
-    service_name, service_cmd, _ = get_service_info(port)
-    
-    port_info = {
-        631: {
-            "nom": "CUPS (Common Unix Printing System)",
-            "description": "Serveur d'impression - Interface web sur http://localhost:631",
-            "securite": "🟡 Peu risqué - Service d'impression local",
-            "action": "Peut être arrêté si pas d'imprimantes"
-        },
-        11434: {
-            "nom": "Ollama (IA/LLM local)",
-            "description": "Serveur pour modèles de langage IA - API sur http://localhost:11434",
-            "securite": "🟡 Peu risqué - Service IA local",
-            "action": "Peut être arrêté si pas utilisé"
-        },
-        3306: {
-            "nom": "MySQL/MariaDB",
-            "description": "Serveur de base de données",
-            "securite": "🔴 Critique - Contient des données importantes",
-            "action": "⚠️ Arrêt délicat - Risque de corruption"
-        },
-        22: {
-            "nom": "SSH (Secure Shell)",
-            "description": "Accès distant sécurisé",
-            "securite": "🟡 Important - Accès administrateur",
-            "action": "⚠️ Ne pas fermer si connexion SSH active"
-        }
+# Fiches détaillées de quelques ports (analyse interactive)
+PORT_NOTES = {
+    631: {
+        "nom": "CUPS (Common Unix Printing System)",
+        "description": "Serveur d'impression - Interface web sur http://localhost:631",
+        "securite": "🟡 Peu risqué - Service d'impression local",
+        "action": "Peut être arrêté si pas d'imprimantes"
+    },
+    11434: {
+        "nom": "Ollama (IA/LLM local)",
+        "description": "Serveur pour modèles de langage IA - API sur http://localhost:11434",
+        "securite": "🟡 Peu risqué - Service IA local",
+        "action": "Peut être arrêté si pas utilisé"
+    },
+    3306: {
+        "nom": "MySQL/MariaDB",
+        "description": "Serveur de base de données",
+        "securite": "🔴 Critique - Contient des données importantes",
+        "action": "⚠️ Arrêt délicat - Risque de corruption"
+    },
+    22: {
+        "nom": "SSH (Secure Shell)",
+        "description": "Accès distant sécurisé",
+        "securite": "🟡 Important - Accès administrateur",
+        "action": "⚠️ Ne pas fermer si connexion SSH active"
     }
-    
-    if port in port_info:
-        return port_info[port]
-    elif 32768 <= port <= 65535:
-        return {
+}
+
+# Familles de ports pour la classification (CLI et GUI); en cas de recouvrement la première l'emporte
+PORT_FAMILIES = (
+    ("remote", (22, 23, 3389, 5900)),
+    ("web", (80, 443, 8080, 8443)),
+    ("db", (3306, 5432, 27017, 1433, 1521, 6379)),
+    ("mail", (25, 587, 110, 143, 993, 995)),
+    ("fileshare", (139, 445)),
+    ("cleartext", (21, 23, 69)),
+)
+
+def _build_family_table():
+    table = [None] * 65536
+    for family, ports in reversed(PORT_FAMILIES):
+        for port in ports:
+            table[port] = family
+    return table
+
+PORT_FAMILY = _build_family_table()
+_KNOWLEDGE = [None] * 65536
+
+def _build_knowledge(port):
+    service_name, service_cmd, _ = get_service_info(port)
+    if port in PORT_NOTES:
+        entry = dict(PORT_NOTES[port])
+    elif port in DYNAMIC_PORTS:
+        entry = {
             "nom": f"Port dynamique {port}",
             "description": "Port assigné temporairement par le système",
             "securite": "🟢 Généralement sans risque",
             "action": "Peut être fermé - Se réouvre automatiquement si nécessaire"
         }
     else:
-        return {
+        entry = {
             "nom": f"Service sur port {port}",
             "description": "Service non identifié",
             "securite": "🟡 À vérifier",
             "action": "Identifier le service avant de fermer"
         }
+    entry.update(port=port, service=service_name, service_cmd=service_cmd, famille=PORT_FAMILY[port])
+    return entry
+
+def port_knowledge(port):
+    """Fiche d'un port: nom, service, famille, description, sécurité, action.
+
+    Construite une seule fois par port puis partagée (ne pas modifier le dict retourné).
+    """
+    entry = _KNOWLEDGE[port]
+    if entry is None:
+        entry = _KNOWLEDGE[port] = _build_knowledge(port)
+    return entry
+
+def analyze_ports(ports):
+    """Fiches de plusieurs ports en un appel: {port: fiche}"""
+    return {port: port_knowledge(port) for port in ports}
+
+def analyze_port(port):
+    """Analyse un port spécifique et retourne des informations détaillées"""
+    return port_knowledge(port)
+
+# --- Classification des ports (moteur de règles) --------------------------------
+# Règles évaluées dans l'ordre, la première qui correspond l'emporte. Champs:
+#   when / also : {"family", "ports", "service" (mots-clés), "banner" (regex)}; il suffit
+#                 qu'un critère corresponde (when ET also si les deux sont présents)
+#   port_range [a, b], port_below n, no_family, service_named, service_missing : conditions
+#   label ({service} = nom du service), severity, root_suffix / root_severity (processus root)
+_WEB = {"family": "web", "service": ["http"], "banner": ["http/", "server:.*http", "http.*server:"]}
+CLASSIFICATION_RULES = [
+    {"name": "dynamique", "port_range": [32768, 65535], "label": "🟢 Dynamique", "severity": "low"},
+    {"name": "acces-distant", "when": {"family": "remote", "service": ["ssh"], "banner": ["^ssh-", "openssh"]},
+     "label": "🔴 Critique — Accès distant", "severity": "high", "root_suffix": " (root)"},
+    {"name": "web-https", "when": _WEB, "also": {"ports": [443, 8443], "service": ["https"], "banner": ["ssl", "tls"]},
+     "label": "🟡 Web — HTTPS", "severity": "medium", "root_suffix": " (process root)", "root_severity": "high"},
+    {"name": "web-http", "when": _WEB,
+     "label": "🟡 Web — HTTP", "severity": "medium", "root_suffix": " (process root)", "root_severity": "high"},
+    {"name": "base-de-donnees",
+     "when": {"family": "db", "service": ["mysql", "postgres", "mongodb", "redis", "mssql", "oracle"]},
+     "label": "🔴 Base de données — Critique", "severity": "high"},
+    {"name": "mail", "when": {"family": "mail", "service": ["smtp", "imap", "pop3"]},
+     "label": "🟠 Mail — Vérifier authentification/relay", "severity": "medium"},
+    {"name": "partage-fichiers", "when": {"family": "fileshare", "service": ["smb", "cifs"]},
+     "label": "🔴 Partage de fichiers — Sensible", "severity": "high"},
+    {"name": "non-chiffre", "when": {"family": "cleartext", "service": ["telnet", "ftp", "tftp"]},
+     "label": "🔴 Non chiffré — Insecure (cleartext)", "severity": "high"},
+    {"name": "privilegie-nomme", "port_below": 1024, "service_named": True,
+     "label": "🔒 Privilégié — {service}", "severity": "medium"},
+    {"name": "privilegie", "port_below": 1024, "label": "🔒 Privilégié (port <1024)", "severity": "medium"},
+    {"name": "suspect", "service_missing": True, "no_family": True,
+     "label": "🔴 Suspicious — Service inconnu", "severity": "high"},
+    {"name": "defaut", "label": "🟡 Service", "severity": "low"},
+]
+RULE_KEYS = {"name", "when", "also", "port_range", "port_below", "no_family", "service_named",
+             "service_missing", "label", "severity", "root_suffix", "root_severity"}
+MATCHER_KEYS = {"family", "ports", "service", "banner"}
+ROOT_USERS = ("root", "0", "administrator")
+CUSTOM_RULES = []
+
+class PortClassifier:
+    """Moteur de classification compilé à partir d'une table de règles.
+
+    Tous les motifs de banner sont fusionnés en une seule regex (un groupe nommé
+    par motif, dans des lookaheads optionnels): un seul passage par banner donne
+    l'ensemble des critères satisfaits. Les mots-clés de service sont évalués une
+    fois par nom de service et les banners déjà vus sont mis en cache.
+    """
+
+    BANNER_CACHE_SIZE = 4096
+
+    def __init__(self, rules):
+        self.rules = []
+        patterns = []
+        self._service_keywords = []  # (id du critère, mots-clés)
+        self._group_matcher = {}
+        for rule in rules:
+            unknown = set(rule) - RULE_KEYS
+            if unknown or "label" not in rule:
+                raise ValueError(f"règle invalide {rule.get('name', rule)}: {', '.join(sorted(unknown)) or 'label manquant'}")
+            matchers = []
+            for key in ("when", "also"):
+                matcher = rule.get(key)
+                if matcher is None:
+                    continue
+                if set(matcher) - MATCHER_KEYS:
+                    raise ValueError(f"critère invalide dans {rule.get('name')}: {', '.join(set(matcher) - MATCHER_KEYS)}")
+                mid = len(self._service_keywords)
+                self._service_keywords.append((mid, tuple(k.lower() for k in matcher.get("service", ()))))
+                for pattern in matcher.get("banner", ()):
+                    re.compile(pattern)  # motif invalide -> re.error explicite
+                    group = f"m{mid}_{len(patterns)}"
+                    self._group_matcher[group] = mid
+                    patterns.append(f"(?=(?:.*?(?P<{group}>{pattern}))?)")
+                matchers.append((mid, matcher.get("family"), frozenset(matcher.get("ports", ()))))
+            low, high = rule.get("port_range", (0, 65535))
+            rooted = "root_suffix" in rule or "root_severity" in rule
+            self.rules.append((
+                low, high, rule.get("port_below", 65536), bool(rule.get("no_family")),
+                bool(rule.get("service_named")), bool(rule.get("service_missing")), tuple(matchers),
+                rule["label"], rule.get("severity", "low"),
+                rule.get("root_suffix", "") if rooted else None, rule.get("root_severity", rule.get("severity", "low")),
+            ))
+        self._banner_re = re.compile("".join(patterns), re.I | re.S) if patterns else None
+        self._service_cache = {}
+        self._banner_cache = {}
+
+    def _service_hits(self, service_name):
+        hits = self._service_cache.get(service_name)
+        if hits is None:
+            service = (service_name or "").lower()
+            hits = frozenset(mid for mid, keywords in self._service_keywords if any(k in service for k in keywords))
+            self._service_cache[service_name] = hits
+        return hits
+
+    def _banner_hits(self, banner):
+        if not banner or self._banner_re is None:
+            return frozenset()
+        hits = self._banner_cache.get(banner)
+        if hits is None:
+            groups = self._banner_re.match(banner).groupdict()
+            hits = frozenset(self._group_matcher[g] for g, value in groups.items() if value is not None)
+            if len(self._banner_cache) >= self.BANNER_CACHE_SIZE:
+                self._banner_cache.clear()
+            self._banner_cache[banner] = hits
+        return hits
+
+    def classify(self, port, service_name=None, pid_infos=None, banner=""):
+        """(étiquette, sévérité) d'un port ouvert; sévérité dans low/medium/high (service None = inconnu)"""
+        family = PORT_FAMILY[port] if 0 <= port < 65536 else None
+        runs_as_root = any(p.get("user") in ROOT_USERS for p in pid_infos) if pid_infos else False
+        lowered = service_name.lower() if service_name else ""
+        named = lowered not in ("", "unknown", "port-dynamique")
+        missing = lowered in ("", "unknown")
+        service_hits = self._service_hits(service_name)
+        banner_hits = None
+
+        for (low, high, below, no_family, need_named, need_missing, matchers,
+             label, severity, root_suffix, root_severity) in self.rules:
+            if port < low or port > high or port >= below:
+                continue
+            if (no_family and family is not None) or (need_named and not named) or (need_missing and not missing):
+                continue
+            matched = True
+            for mid, rule_family, ports in matchers:
+                if (rule_family and family == rule_family) or port in ports or mid in service_hits:
+                    continue
+                if banner_hits is None:
+                    banner_hits = self._banner_hits(banner)
+                if mid not in banner_hits:
+                    matched = False
+                    break
+            if not matched:
+                continue
+            if "{" in label:
+                label = label.format(service=service_name)
+            if runs_as_root and root_suffix is not None:
+                return (label + root_suffix, root_severity)
+            return (label, severity)
+        return ("🟡 Service", "low")
+
+    def classify_many(self, results):
+        """Classe un lot de (port, service, pid_infos, banner); les doublons (multi-hôtes) ne sont évalués qu'une fois"""
+        memo = {}
+        out = []
+        for port, service_name, pid_infos, banner in results:
+            root = any(p.get("user") in ROOT_USERS for p in pid_infos) if pid_infos else False
+            key = (port, service_name, root, banner)
+            label = memo.get(key)
+            if label is None:
+                label = memo[key] = self.classify(port, service_name, pid_infos, banner)
+            out.append(label)
+        return out
+
+_CLASSIFIER = None
+
+def load_classification_rules(path):
+    """Ajoute des règles (liste JSON, même format que CLASSIFICATION_RULES), prioritaires sur les règles intégrées"""
+    global _CLASSIFIER
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if isinstance(rules, dict):
+        rules = [rules]
+    PortClassifier(rules)  # validation avant de les retenir
+    CUSTOM_RULES.extend(rules)
+    _CLASSIFIER = None
+    return len(rules)
+
+def get_classifier():
+    """Classifieur partagé (CLI/GUI), compilé au premier usage; $CHECK_PORT_RULES peut désigner un fichier de règles"""
+    global _CLASSIFIER
+    if _CLASSIFIER is None:
+        path = os.environ.get("CHECK_PORT_RULES")
+        if path and not CUSTOM_RULES:
+            try:
+                load_classification_rules(path)
+            except (OSError, ValueError, re.error) as e:
+                print(f"⚠️  Règles de classification ignorées ({path}): {e}")
+        _CLASSIFIER = PortClassifier(CUSTOM_RULES + CLASSIFICATION_RULES)
+    return _CLASSIFIER
+
+def classify_port(port, service_name=None, pid_infos=None, banner="", target_ip=None):
+    """Classe un port et renvoie (étiquette, sévérité) avec le moteur de règles partagé"""
+    return get_classifier().classify(port, service_name, pid_infos, banner)
+
+def classify_ports(results):
+    """Classe un lot de (port, service, pid_infos, banner) en un appel"""
+    return get_classifier().classify_many(results)
 
 def show_help():
     """Affiche l'aide du script"""
@@ -399,28 +2284,142 @@ def show_help():
     print("=" * 40)
     print("USAGE: python3 check_port.py [target] [ports]")
     print()
+    print("CIBLES:")
+    print("  'host'            : nom d'hôte ou IP")
+    print("  '10.0.0.0/22'     : bloc CIDR")
+    print("  '10.0.0.1-20'     : plage d'adresses (ou 10.0.0.1-10.0.0.20)")
+    print("  '@hosts.txt'      : fichier d'hôtes (un par ligne)")
+    print("  'h1,h2,...'       : plusieurs cibles, scannées ensemble")
+    print()
     print("OPTIONS DE PORTS:")
     print("  (vide)       : ports communs seulement")
     print("  'all'        : TOUS les ports 1-65535 (⚠️ très long!)")
     print("  'common'     : ports communs uniquement")
-    print("  'top1000'    : ports 1-1000")
-    print("  'top5000'    : ports 1-5000")
+    print("  'top1000'    : les 1000 ports les plus fréquemment ouverts")
+    print("  'top5000'    : les 5000 ports les plus fréquemment ouverts")
     print("  '1-1024'     : plage personnalisée")
     print("  '22,80,443'  : ports spécifiques")
     print("  'analyze'    : analyser des ports spécifiques")
     print("  --show-dynamic: afficher aussi les ports dynamiques/éphémères (par défaut masqués)")
+    print("  --engine E   : moteur de scan 'auto' (défaut), 'threads', 'asyncio' ou 'selectors' (epoll)")
+    print("  --no-aimd    : désactive l'ajustement automatique de la concurrence (AIMD)")
+    print("  --processes N: répartit le scan sur N processus (gros balayages, tous les cœurs)")
+    print("  --no-banner  : balayage seul, sans récupération des banners (plus rapide)")
+    print("  --all-addresses: scanne toutes les adresses IPv4/IPv6 de la cible (résultats fusionnés par port)")
+    print("  --udp        : balayage UDP (DNS, NTP, SNMP...; ports UDP communs par défaut)")
+    print("  --rate N     : plafonne le débit à N connexions (ou paquets UDP) par seconde")
+    print("  --resume     : reprend un scan interrompu là où il s'était arrêté")
+    print("  --local      : cible locale -> lit les sockets en écoute dans /proc/net (Linux, instantané)")
+    print("  --verify     : avec --local, confirme chaque port en écoute par une connexion")
+    print("  --services F : complète les noms de services depuis /etc/services ou nmap-services")
+    print("  --rules F    : ajoute des règles de classification (JSON, prioritaires; ou $CHECK_PORT_RULES)")
+    print("  --checkpoint F: fichier d'état à utiliser (automatique au-delà de 10000 couples)")
     print()
     print("EXEMPLES:")
     print("  python3 check_port.py 192.168.1.1 all")
     print("  python3 check_port.py localhost top1000")
     print("  python3 check_port.py 10.0.0.1 1-1024")
     print("  python3 check_port.py localhost 631,11434,33362")
+    print("  python3 check_port.py --engine asyncio 10.0.0.1 all")
+    print("  python3 check_port.py 192.168.1.0/24 common")
+    print("  python3 check_port.py --udp 10.0.0.1")
+    print("  python3 check_port.py --local localhost all")
     print()
     print("⚡ Le script s'optimise automatiquement selon le nombre de ports!")
     print()
 
+def format_endpoint(host, port):
+    """host:port, avec crochets pour IPv6 ([::1]:22)"""
+    return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+def report_open_ports(open_ports, show_dynamic=False, pids=True):
+    """Affiche les ports ouverts d'une cible et retourne ceux affichés (pids=False: sans recherche de PID TCP)"""
+    # Filtrer les ports dynamiques par défaut (masqués)
+    if not show_dynamic:
+        display_ports = [ (p,b) for (p,b) in open_ports if get_service_info(p)[0] != "Port-Dynamique" ]
+    else:
+        display_ports = open_ports[:]
+
+    if not display_ports:
+        print("❌ Aucun port ouvert détecté (après filtrage des ports dynamiques).")
+        return display_ports
+
+    print(f"\n🎯 {len(display_ports)} ports ouverts trouvés:")
+    display_ports = sorted(display_ports)
+    knowledge = analyze_ports(p for p, _ in display_ports)
+    # Récupérer les PID et infos d'application (best-effort), puis classer le lot en un appel
+    all_pids = [get_pids_for_port(p) if pids else [] for p, _ in display_ports]
+    labels = classify_ports((p, get_service_info(p)[0], pid_infos, banner)
+                            for (p, banner), pid_infos in zip(display_ports, all_pids))
+    for (p, banner), pid_infos, (label, _) in zip(display_ports, all_pids, labels):
+        service_name, _, _ = get_service_info(p)
+
+        pid_display = ""
+        if not pids:
+            pid_display = "(udp)"
+        elif pid_infos:
+            pid_display = ", ".join(f"PID {x['pid']}:{x['name']}" for x in pid_infos)
+        else:
+            pid_display = "(PID inconnu - exécutez avec sudo pour plus de détails)"
+
+        # Analyse du port pour plus d'infos
+        port_analysis = knowledge[p]
+        security_icon = port_analysis["securite"][:2]  # Récupère juste l'emoji
+
+        print(f"  🔓 Port {p} ({service_name}) {security_icon}  {pid_display}")
+        print(f"      📋 {port_analysis['description']}")
+        print(f"      🛡️  {label}")
+        if banner:
+            print(f"      🏷️  Banner: {banner[:80]}...")
+    return display_ports
+
+def run_udp_scan(target, resolved, ports, show_dynamic=False, rate=None):
+    """Mode --udp: balayage UDP cadencé (`rate` paquets/s, UDP_RATE par défaut) puis résumé par cible"""
+    rate = rate or UDP_RATE
+    target_ips = [ip for _, ip in resolved]
+    names = list(dict.fromkeys(name for name, _ in resolved))
+    num_ports = len(ports) * len(target_ips)
+    print(f"Début du scan UDP sur: {target} ({', '.join(target_ips)})")
+    print(f"Configuration: {num_ports} sondes, débit={rate:g} paquets/s, timeout={UDP_TIMEOUT}s, "
+          f"renvois={UDP_RETRIES}")
+    start = time.time()
+    open_ports = {ip: [] for ip in target_ips}
+    counts = {"open": 0, "closed": 0, "filtered": 0}
+    for host, port, status, info in scan_targets_udp(target_ips, ports, rate=rate):
+        counts[status] = counts.get(status, 0) + 1
+        if status == "open":
+            open_ports[host].append((port, info))
+            print(f"🟢 {format_endpoint(host, port)}/udp is OPEN{f' - {info[:50]}' if info else ''}")
+    print(f"\n✅ Scan UDP terminé en {time.time() - start:.2f} secondes: {counts['open']} ouverts, "
+          f"{counts['closed']} fermés (ICMP), {counts['filtered']} sans réponse (open|filtered).")
+    for name in names:
+        ips = [ip for n, ip in resolved if n == name]
+        merged, _ = merge_open_ports(open_ports, ips)
+        if len(names) > 1:
+            print(f"\n🖥️  {name} ({', '.join(ips)})")
+        report_open_ports(merged, show_dynamic, pids=False)
+
+def pop_option(args, name, default=None):
+    """Retire `--name valeur` ou `--name=valeur` de args et retourne la valeur"""
+    value = default
+    rest = []
+    i = 0
+    while i < len(args):
+        a = args[i]
+        if a == name and i + 1 < len(args):
+            value = args[i + 1]
+            i += 2
+            continue
+        if a.startswith(name + "="):
+            value = a.split("=", 1)[1]
+        else:
+            rest.append(a)
+        i += 1
+    args[:] = rest
+    return value
+
 def main():
-    # Simple parsing des arguments: support -h/--help et --show-dynamic
+    # Simple parsing des arguments: support -h/--help, --show-dynamic, --engine et --processes
     args = sys.argv[1:]
     if any(a in ("-h", "--help", "help") for a in args):
         show_help()
@@ -431,101 +2430,251 @@ def main():
         show_dynamic = True
         args = [a for a in args if a != "--show-dynamic"]
 
+    adaptive = "--no-aimd" not in args
+    args = [a for a in args if a != "--no-aimd"]
+
+    banner = "--no-banner" not in args
+    args = [a for a in args if a != "--no-banner"]
+
+    all_addresses = "--all-addresses" in args
+    args = [a for a in args if a != "--all-addresses"]
+
+    udp = "--udp" in args
+    args = [a for a in args if a != "--udp"]
+
+    resume = "--resume" in args
+    args = [a for a in args if a != "--resume"]
+
+    services_file = pop_option(args, "--services")
+    if services_file:
+        try:
+            print(f"📚 {load_services(services_file)} services ajoutés depuis {services_file}")
+        except OSError as e:
+            print(f"Base de services illisible {services_file}: {e}")
+            sys.exit(1)
+
+    rules_file = pop_option(args, "--rules")
+    if rules_file:
+        try:
+            print(f"🛡️  {load_classification_rules(rules_file)} règles de classification chargées depuis {rules_file}")
+        except (OSError, ValueError, re.error) as e:
+            print(f"Règles de classification invalides {rules_file}: {e}")
+            sys.exit(1)
+
+    local_mode = "--local" in args
+    verify = "--verify" in args
+    args = [a for a in args if a not in ("--local", "--verify")]
+    state_file = pop_option(args, "--checkpoint")
+
+    engine = pop_option(args, "--engine", DEFAULT_ENGINE)
+    if engine != "auto" and engine not in ENGINES:
+        print(f"Moteur inconnu: {engine} (choix: auto, {', '.join(ENGINES)})")
+        sys.exit(1)
+
+    try:
+        processes = int(pop_option(args, "--processes", "1"))
+    except ValueError:
+        print("--processes attend un nombre de processus (ex: --processes 4)")
+        sys.exit(1)
+    processes = max(1, processes)
+
+    try:
+        rate = float(pop_option(args, "--rate", "0"))
+    except ValueError:
+        print("--rate attend un nombre de connexions par seconde (ex: --rate 200)")
+        sys.exit(1)
+    rate = rate if rate > 0 else None
+
     if len(args) >= 1:
         target = args[0]
     else:
         target = DEFAULT_TARGET
     ports_arg = args[1] if len(args) >= 2 else None
     ports = parse_ports(ports_arg)
+    if udp and (not ports_arg or ports_arg.lower() == "common"):
+        ports = UDP_COMMON_PORTS
 
-    try:
-        target_ip = socket.gethostbyname(target)
-    except Exception as e:
-        print(f"Erreur résolution DNS pour {target}: {e}")
-        sys.exit(1)
+    # Reprise: les adresses et les ports viennent du fichier d'état (indices du bitmap stables)
+    explicit_state = state_file is not None
+    state_file = state_file or checkpoint_path(target, ports_arg, all_addresses)
+    checkpoint = None
+    if resume and not udp:
+        try:
+            checkpoint = ScanCheckpoint.load(state_file)
+        except FileNotFoundError:
+            print(f"Aucun point de reprise trouvé ({state_file}): scan complet.")
+        except Exception as e:
+            print(f"Point de reprise illisible {state_file}: {e}")
+            sys.exit(1)
 
-    # Optimisation automatique selon le nombre de ports
-    num_ports = len(ports)
-    if num_ports > 10000:
-        timeout = 0.3
-        workers = min(1000, num_ports // 10)
-        print(f"⚡ Mode scan rapide activé: {num_ports} ports, timeout={timeout}s, workers={workers}")
-    elif num_ports > 1000:
-        timeout = 0.5
-        workers = min(800, num_ports // 5)
-        print(f"🚀 Mode scan accéléré: {num_ports} ports, timeout={timeout}s, workers={workers}")
+    if checkpoint:
+        resolved = checkpoint.resolved
+        ports = checkpoint.ports
     else:
-        timeout = DEFAULT_TIMEOUT
-        workers = min(DEFAULT_WORKERS, max(50, num_ports))
+        try:
+            targets = parse_targets(target)
+        except Exception as e:
+            print(f"Cible invalide {target}: {e}")
+            sys.exit(1)
+        resolved, errors = resolve_targets(targets, all_addresses)
+        for name, e in errors:
+            print(f"Erreur résolution DNS pour {name}: {e}")
+        if not resolved:
+            sys.exit(1)
+    names = list(dict.fromkeys(name for name, _ in resolved))
+    multi = len(names) > 1
+    target_ips = [ip for _, ip in resolved]
 
-    print(f"Début du scan sur: {target} ({target_ip})")
-    print(f"Ports à scanner: {num_ports} ports")
-    print(f"Configuration: timeout={timeout}s, workers={workers}")
+    if udp:
+        run_udp_scan(target, resolved, ports, show_dynamic, rate)
+        return
+
+    num_ports = len(ports) * len(target_ips)
+    results = None
+    if local_mode:
+        # Cible locale: le noyau connaît déjà les sockets en écoute, inutile de se connecter partout
+        if all(is_local_target_strict(ip) for ip in target_ips):
+            try:
+                results = scan_local(target_ips, ports, verify, DEFAULT_TIMEOUT, banner)
+                print(f"🏠 Inventaire local via /proc/net{' (vérification par connexion)' if verify else ''}")
+            except OSError as e:
+                print(f"⚠️  {e} -> scan réseau classique")
+        else:
+            print("⚠️  --local ignoré: la cible n'est pas une interface locale -> scan réseau classique")
+
+    # Inventaire local: ni moteur, ni concurrence, ni point de reprise (lecture instantanée)
+    timeout, workers, static_workers, controller, limiter = DEFAULT_TIMEOUT, 0, 0, None, None
+    if results is not None:
+        checkpoint = None
+    else:
+        # Optimisation automatique selon le nombre de couples (hôte, port)
+        if num_ports > 10000:
+            timeout = 0.3
+            workers = min(1000, num_ports // 10)
+            print(f"⚡ Mode scan rapide activé: {num_ports} ports, timeout={timeout}s, workers={workers}")
+        elif num_ports > 1000:
+            timeout = 0.5
+            workers = min(800, num_ports // 5)
+            print(f"🚀 Mode scan accéléré: {num_ports} ports, timeout={timeout}s, workers={workers}")
+        else:
+            workers = min(DEFAULT_WORKERS, max(50, num_ports))
+
+        # Les moteurs événementiels ne coûtent pas un thread par connexion;
+        # le contrôleur AIMD part de la formule statique et ajuste pendant le scan
+        engine = resolve_engine(engine, num_ports)
+        static_workers = workers
+        workers, controller = plan_concurrency(engine, workers, num_ports, adaptive)
+        if processes > 1:
+            # Chaque processus a son propre contrôleur: le parent ne fait que fusionner
+            controller = None
+        # Seau à jetons global: chaque connexion, quel que soit le moteur, consomme un jeton
+        limiter = TokenBucket(rate) if rate and processes == 1 else None
+
+        # Point de reprise automatique pour les longs scans (ou sur demande)
+        if checkpoint:
+            print(f"♻️  Reprise depuis {state_file}: {checkpoint.completed}/{num_ports} couples déjà scannés")
+        elif resume or explicit_state or num_ports > 10000:
+            checkpoint = ScanCheckpoint(state_file, target, resolved, ports)
+            print(f"💾 Point de reprise: {state_file} (relancer avec --resume après une interruption)")
+
+    if len(target_ips) > 1:
+        print(f"Début du scan sur: {target} ({', '.join(target_ips) if not multi else f'{len(target_ips)} adresses'})")
+        print(f"Ports à scanner: {len(ports)} ports x {len(target_ips)} adresses = {num_ports}")
+    else:
+        print(f"Début du scan sur: {target} ({target_ips[0]})")
+        print(f"Ports à scanner: {num_ports} ports")
+    target_ip = target_ips[0]
+    if results is None:
+        print(f"Configuration: moteur={engine}, timeout={timeout}s (adaptatif), workers={workers}"
+              f"{f' (AIMD, départ {controller.limit})' if controller else ''}"
+              f"{f', processus={processes}' if processes > 1 else ''}"
+              f"{f', débit max={rate:g} conn/s' if rate else ''}")
     
-    if num_ports > 1000:
+    show_progress = results is None and (num_ports > 1000 or rate is not None)
+    if show_progress:
         print("📊 Affichage du progrès activé pour les gros scans...")
     
     start = time.time()
-    open_ports = []
-    scanned_count = 0
-    progress_interval = max(100, num_ports // 20)
+    open_ports = checkpoint.open_ports if checkpoint else {ip: [] for ip in target_ips}
+    scanned_count = resumed = checkpoint.completed if checkpoint else 0
+    progress_interval = max(100 if not rate else 1, num_ports // 20)
     
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = {ex.submit(scan_port, target_ip, p, timeout): p for p in ports}
-        for fut in as_completed(futures):
-            port, status, info = fut.result()
+    # Le palier sert de valeur initiale; le RTT mesuré prend le relais dès les premières réponses
+    rtts = {ip: RttEstimator(initial=timeout) for ip in target_ips}
+    if results is None and processes > 1:
+        results = scan_targets_sharded(target_ips, ports, timeout, static_workers, engine, processes, adaptive, banner,
+                                       rate, checkpoint)
+    elif results is None:
+        results = scan_targets(target_ips, ports, rtts, workers, engine, controller, banner, limiter, checkpoint)
+    try:
+        for host, port, status, info in results:
             scanned_count += 1
-            
+
             if status == "open":
-                open_ports.append((port, info))
-                print(f"🟢 port {port} is OPEN{f' - {info[:50]}' if info else ''}")
-            
-            if num_ports > 1000 and scanned_count % progress_interval == 0:
+                if not checkpoint:
+                    open_ports[host].append((port, info))
+                where = f"{format_endpoint(host, port)}" if len(target_ips) > 1 else f"port {port}"
+                print(f"🟢 {where} is OPEN{f' - {info[:50]}' if info else ''}")
+            if checkpoint:
+                checkpoint.record(host, port, status, info)
+
+            if show_progress and scanned_count % progress_interval == 0:
                 percentage = (scanned_count / num_ports) * 100
                 elapsed = time.time() - start
-                rate = scanned_count / elapsed if elapsed > 0 else 0
-                eta = (num_ports - scanned_count) / rate if rate > 0 else 0
+                speed = (scanned_count - resumed) / elapsed if elapsed > 0 else 0
+                eta = (num_ports - scanned_count) / speed if speed > 0 else 0
+                concurrency = controller.limit if controller else workers
+                # Débit obtenu (jetons accordés, ou ports traités en mode multi-processus) face à la cible
+                paced = f" ({(limiter.achieved() if limiter else speed):.0f}/{rate:g} conn/s visés)" if rate else ""
                 print(f"📈 Progrès: {scanned_count}/{num_ports} ({percentage:.1f}%) - "
-                      f"Vitesse: {rate:.0f} ports/s - ETA: {eta:.0f}s")
+                      f"Vitesse: {speed:.0f} ports/s{paced} - Concurrence: {concurrency} - ETA: {eta:.0f}s")
+    except BaseException as e:
+        # Ctrl-C ou erreur: on garde ce qui est acquis pour --resume
+        if checkpoint and checkpoint.save():
+            again = " ".join(sys.argv) + ("" if resume else " --resume")
+            print(f"\n💾 État sauvegardé ({checkpoint.completed}/{num_ports} couples) dans {state_file}")
+            print(f"   Reprendre avec: python3 {again}")
+        if isinstance(e, KeyboardInterrupt):
+            print("⏹️  Scan interrompu.")
+            sys.exit(130)
+        raise
+    if checkpoint:
+        checkpoint.remove()
     
     end = time.time()
-    rate = num_ports / (end - start) if (end - start) > 0 else 0
+    speed = (num_ports - resumed) / (end - start) if (end - start) > 0 else 0
     print(f"\n✅ Scan terminé en {end - start:.2f} secondes.")
-    print(f"📊 Vitesse moyenne: {rate:.0f} ports/seconde")
+    print(f"📊 Vitesse moyenne: {speed:.0f} ports/seconde{f' (débit max {rate:g} conn/s)' if rate else ''}")
 
-    # Filtrer les ports dynamiques par défaut (masqués)
-    if not show_dynamic:
-        display_ports = [ (p,b) for (p,b) in open_ports if get_service_info(p)[0] != "Port-Dynamique" ]
-    else:
-        display_ports = open_ports[:]
+    # Table des sockets relue une fois: les recherches de PID du résumé sont ensuite en O(1)
+    refresh_pid_index()
 
-    if not display_ports:
-        print("❌ Aucun port ouvert détecté (après filtrage des ports dynamiques).")
-        if not show_dynamic:
+    if multi:
+        # Résumé par cible (adresses fusionnées); la fermeture interactive reste réservée à une cible unique
+        total = 0
+        for name in names:
+            ips = [ip for n, ip in resolved if n == name]
+            merged, _ = merge_open_ports(open_ports, ips)
+            print(f"\n🖥️  {name} ({', '.join(ips)})")
+            total += len(report_open_ports(merged, show_dynamic))
+        if not total and not show_dynamic:
             print("Si vous voulez afficher aussi les ports dynamiques, relancez avec --show-dynamic")
+        print("\nℹ️  Pour fermer des ports, relancez le script sur une cible unique.")
         return
 
-    print(f"\n🎯 {len(display_ports)} ports ouverts trouvés:")
-    for p, banner in sorted(display_ports):
-        service_name, _, _ = get_service_info(p)
-        banner_info = f" - {banner[:60]}..." if banner and len(banner) > 60 else f" - {banner}" if banner else ""
+    rtt = rtts[target_ip]
+    if rtt.srtt is not None and processes == 1:
+        print(f"⏱️  RTT lissé: {rtt.srtt * 1000:.1f} ms - timeout adaptatif final: {rtt.timeout():.2f}s")
 
-        # Récupérer les PID et infos d'application (best-effort)
-        pid_infos = get_pids_for_port(p)
-        pid_display = ""
-        if pid_infos:
-            pid_display = ", ".join(f"PID {x['pid']}:{x['name']}" for x in pid_infos)
-        else:
-            pid_display = "(PID inconnu - exécutez avec sudo pour plus de détails)"
-
-        # Analyse du port pour plus d'infos
-        port_analysis = analyze_port(p)
-        security_icon = port_analysis["securite"][:2]  # Récupère juste l'emoji
-
-        print(f"  🔓 Port {p} ({service_name}) {security_icon}  {pid_display}")
-        print(f"      📋 {port_analysis['description']}")
-        if banner:
-            print(f"      🏷️  Banner: {banner[:80]}...")
+    merged, where = merge_open_ports(open_ports, target_ips)
+    if len(target_ips) > 1:
+        for p, ips in sorted(where.items()):
+            print(f"  🌐 Port {p} ouvert sur: {', '.join(ips)}")
+    display_ports = report_open_ports(merged, show_dynamic)
+    if not display_ports:
+        if not show_dynamic:
+            print("Si vous voulez afficher aussi les ports dynamiques, relancez avec --show-dynamic")
+        return
 
     sel = input("\n🔧 Saisis les ports à fermer (séparés par des virgules), ou Enter pour quitter : ").strip()
     if not sel:
@@ -564,15 +2713,12 @@ def main():
         return
 
     overall = {}
+    refresh_pid_index()
     for port in chosen:
-        pids = set()
-        if "linux" in plat or "darwin" in plat:
-            pids = find_pids_linux(port)
-        elif "windows" in plat:
-            pids = find_pids_windows(port)
-        else:
+        if not any(p in plat for p in ("linux", "darwin", "windows")):
             print(f"Plateforme non supportée: {plat}")
             continue
+        pids = find_pids(port)
 
         if not pids:
             print(f"  Port {port} : aucun PID trouvé (si tu es root, relance le script avec sudo).")
@@ -582,8 +2728,9 @@ def main():
         service_name, service_cmd, _ = get_service_info(port)
         print(f"  🔍 Port {port} ({service_name}) : PIDs trouvés -> {sorted(pids)}")
         
+        details = get_processes_details(pids)
         for pid in sorted(pids):
-            process_info = get_process_details(pid)
+            process_info = details[pid]
             print(f"    📋 PID {pid}: {process_info['name']} (user: {process_info['username']})")
             print(f"        CMD: {process_info['cmdline'][:80]}...")
 
@@ -605,7 +2752,8 @@ def main():
                     overall[port] = {"found": sorted(pids), "service_stopped": True}
                     
                     time.sleep(1)
-                    new_pids = find_pids_linux(port) if "linux" in plat else find_pids_windows(port)
+                    refresh_pid_index()
+                    new_pids = find_pids(port)
                     if not new_pids:
                         print(f"    ✅ Port {port} fermé avec succès!")
                     else:
@@ -630,6 +2778,7 @@ def main():
             continue
 
         res = kill_pids(pids, port)
+        refresh_pid_index()
         overall[port] = {"found": sorted(pids), "killed": res}
         for pid,(ok,msg) in res.items():
             print(f"    PID {pid} -> {'✅ OK' if ok else '❌ FAIL'} : {msg}")
@@ -654,4 +2803,5 @@ def main():
     print("\n🏁 Terminé.")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -14,8 +14,9 @@ import shutil
 import threading
 import time
 import shlex
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import socket
+import queue
+import bisect
+from concurrent.futures import ThreadPoolExecutor
 
 
 
@@ -25,22 +26,35 @@ Guide d'utilisation - Scanner de Ports (Interface Graphique)
 =========================================================
 
 1) Configuration de base
-- Cible : saisissez une adresse IP ou un nom d'hôte (ex: localhost, 192.168.1.1).
+- Cible : saisissez une adresse IP ou un nom d'hôte (ex: localhost, 192.168.1.1),
+    un bloc CIDR (10.0.0.0/24), une plage (10.0.0.1-20), plusieurs cibles séparées par
+    des virgules ou un fichier d'hôtes (@hosts.txt).
 - Ports : choisissez une option dans la liste (common, top1000, top5000, all, 1-1024),
+    topN = les N ports les plus fréquemment ouverts, scannés en premier;
     ou entrez une liste/intervalle manuellement (ex: 22,80,443 or 8000-8100).
 
 2) Options
 - "Afficher les ports dynamiques" : cochez pour inclure les ports éphémères (32768-65535).
     Par défaut ils sont masqués pour réduire le bruit.
+- "Récupérer les banners" : décochez pour un balayage seul, plus rapide (pas de banner).
+- "Toutes les adresses (IPv4+IPv6)" : scanne chaque adresse résolue de la cible en même temps
+    (par défaut : IPv4 si disponible, sinon IPv6).
+- "Inventaire local (/proc)" : pour une cible locale sous Linux, lit directement les sockets
+    en écoute du noyau au lieu de se connecter à chaque port (audit complet instantané).
+- "Débit max" : nombre maximal de connexions par seconde (vide = illimité), pour un scan
+    régulier qui ne déclenche pas les IDS et ne sature pas un petit lien.
 
 3) Contrôles principaux
-- 🚀 Démarrer le Scan : lance le scan en arrière-plan et affiche la progression.
+- 🚀 Démarrer le Scan : lance le scan en arrière-plan et affiche la progression (débit, temps restant);
+    les ports ouverts apparaissent dans le tableau dès qu'ils sont trouvés.
 - ⏹️ Arrêter : stoppe le scan en cours (les résultats déjà trouvés restent affichés).
 - �️ Effacer : supprime toutes les lignes de résultats affichées.
 - ❓ Aide : ouvre cette fenêtre d'aide.
 
 4) Résultats
-- La table affiche : Port | Service | PID | Processus | Sécurité | Actions
+- La table affiche : Cible | Port | Service | PID | Processus | Sécurité | Actions
+- Les lignes apparaissent tout de suite avec « … » dans les colonnes PID/Processus : les processus
+    sont recherchés en arrière-plan et les lignes se complètent au fur et à mesure.
 - Double-clic sur une ligne : ouvre une fenêtre de détails pour ce port (banner, PIDs, cmdline, actions).
 - Clic droit (menu contextuel) : options rapides pour arrêter le service, tuer le processus ou copier les détails.
 
@@ -89,14 +103,64 @@ FONT_TITLE = ("SF Pro Display", 18, "bold")
 FONT_SUB = ("SF Pro Text", 12)
 FONT_UI = ("SF Pro Text", 12)
 
+# Enrichissement PID/processus en arrière-plan (lsof/ss/ps hors du thread Tk)
+ENRICH_WORKERS = 8
+ENRICH_POLL_MS = 50        # période de vidage de la file de résultats
+ENRICH_BATCH = 200         # lignes mises à jour au plus par passage
+PID_PENDING = "…"
+
+# Progression: le thread de scan publie ses compteurs, un minuteur Tk les affiche
+PROGRESS_POLL_MS = 66      # ~15 rafraîchissements par seconde, quel que soit le nombre de ports
+STREAM_BATCH = 500         # ports ouverts insérés au plus par rafraîchissement
+
+
+class ScanProgress:
+    """État d'un scan partagé entre le thread de scan (seul écrivain) et le minuteur Tk.
+
+    Le thread de scan ne touche jamais à Tk: il met à jour ces compteurs, ajoute
+    chaque port ouvert à afficher à `found` (liste qui ne fait que croître), puis pose
+    `message` (texte final en cas d'arrêt) avant `done`. Le minuteur Tk avance `shown`.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.total = 0
+        self.scanned = 0
+        self.status = "Préparation du scan..."
+        self.controller = None
+        self.limiter = None
+        self.rate = None
+        self.found = []
+        self.shown = 0
+        self.message = None
+        self.done = False
+
+    def describe(self):
+        """Texte de progression: compteur, concurrence, débit mesuré et temps restant."""
+        if not self.scanned:
+            return self.status
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        speed = self.scanned / elapsed
+        remaining = (self.total - self.scanned) / speed if speed else 0
+        parts = [f"concurrence {self.controller.limit}"] if self.controller else []
+        if self.limiter:
+            parts.append(f"{self.limiter.achieved():.0f}/{self.rate:g} conn/s")
+        else:
+            parts.append(f"{speed:.0f} ports/s")
+        parts.append(f"reste ~{remaining:.0f}s")
+        return (f"Scanné {self.scanned}/{self.total} ports, {len(self.found)} ouvert(s) "
+                f"({', '.join(parts)})...")
+
 
 # Import des fonctions du scanner principal
 try:
     from check_port import (
-        parse_ports, scan_port, get_service_info, get_pids_for_port,
-        find_pids_linux, find_pids_windows, get_process_details,
-        kill_pids, is_local_target_strict, get_local_ips,
+        parse_ports, parse_targets, resolve_targets, host_sort_key,
+        scan_port, scan_targets, get_service_info, get_pids_for_port,
+        find_pids_linux, find_pids_windows, get_process_details, refresh_pid_index,
+        kill_pids, is_local_target_strict, get_local_ips, classify_port, classify_ports,
         DEFAULT_TARGET, DEFAULT_TIMEOUT, DEFAULT_WORKERS,
+        DEFAULT_ENGINE, ENGINES, resolve_engine, plan_concurrency, RttEstimator, TokenBucket, scan_local,
         COMMON_PORTS, ALL_PORTS
     )
 except ImportError:
@@ -117,9 +181,18 @@ class PortScannerGUI:
         # Variables
         self.scan_running = False
         self.scan_results = []
+        self.result_keys = []   # clés de tri (hôte, port) parallèles à scan_results
         self.is_admin = self.check_admin_privileges()
         self.admin_dialog_shown = False  # Pour éviter de redemander
 
+        # Recherche des PID hors du thread Tk: le pool interroge lsof/ss/ps, la file
+        # ramène les résultats et un minuteur Tk met les lignes à jour par lots.
+        self.enrich_pool = ThreadPoolExecutor(max_workers=ENRICH_WORKERS)
+        self.enrich_queue = queue.Queue()
+        self.enrich_generation = 0   # incrémenté à chaque effacement: ignore les résultats périmés
+        self.enrich_pending = 0
+        self.enrich_polling = False
+
         # Compute a one-time scale based on the screen size and derive
         # scaled font tuples. This makes the UI responsive to screen
         # resolution at startup but avoids continuous resizing.
@@ -575,6 +648,48 @@ class PortScannerGUI:
         )
         self.show_dynamic_check.grid(row=0, column=0, sticky=tk.W)
 
+        # Moteur de scan
+        ttk.Label(options_frame, text="Moteur:").grid(row=0, column=1, sticky=tk.W, padx=(20, 5))
+        self.engine_var = tk.StringVar(value=DEFAULT_ENGINE)
+        self.engine_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.engine_var,
+            values=["auto"] + list(ENGINES),
+            state="readonly",
+            width=10
+        )
+        self.engine_combo.grid(row=0, column=2, sticky=tk.W)
+
+        self.banner_var = tk.BooleanVar(value=True)
+        self.banner_check = ttk.Checkbutton(
+            options_frame,
+            text="Récupérer les banners",
+            variable=self.banner_var
+        )
+        self.banner_check.grid(row=0, column=3, sticky=tk.W, padx=(20, 0))
+
+        self.all_addresses_var = tk.BooleanVar(value=False)
+        self.all_addresses_check = ttk.Checkbutton(
+            options_frame,
+            text="Toutes les adresses (IPv4+IPv6)",
+            variable=self.all_addresses_var
+        )
+        self.all_addresses_check.grid(row=0, column=4, sticky=tk.W, padx=(20, 0))
+
+        self.local_var = tk.BooleanVar(value=False)
+        self.local_check = ttk.Checkbutton(
+            options_frame,
+            text="Inventaire local (/proc)",
+            variable=self.local_var
+        )
+        self.local_check.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+
+        # Débit max (seau à jetons partagé par tous les moteurs)
+        ttk.Label(options_frame, text="Débit max (conn/s):").grid(row=0, column=5, sticky=tk.W, padx=(20, 5))
+        self.rate_var = tk.StringVar(value="")
+        self.rate_entry = ttk.Entry(options_frame, textvariable=self.rate_var, width=8)
+        self.rate_entry.grid(row=0, column=6, sticky=tk.W)
+
         # Boutons
         buttons_frame = ttk.Frame(main_frame)
         buttons_frame.grid(row=3, column=0, columnspan=3, pady=10)
@@ -621,12 +736,13 @@ class PortScannerGUI:
         # Treeview pour les résultats
         self.tree = ttk.Treeview(
             results_frame,
-            columns=("Port", "Service", "PID", "Processus", "Sécurité", "Actions"),
+            columns=("Cible", "Port", "Service", "PID", "Processus", "Sécurité", "Actions"),
             show="headings",
             height=15
         )
 
         # Configuration des colonnes
+        self.tree.heading("Cible", text="Cible")
         self.tree.heading("Port", text="Port")
         self.tree.heading("Service", text="Service")
         self.tree.heading("PID", text="PID")
@@ -634,6 +750,7 @@ class PortScannerGUI:
         self.tree.heading("Sécurité", text="Sécurité")
         self.tree.heading("Actions", text="Actions")
 
+        self.tree.column("Cible", width=120)
         self.tree.column("Port", width=80, anchor=tk.CENTER)
         self.tree.column("Service", width=120)
         self.tree.column("PID", width=80, anchor=tk.CENTER)
@@ -692,83 +809,11 @@ class PortScannerGUI:
         """Classe un port et renvoie une étiquette lisible et un niveau de sévérité.
 
         Retour: (label_str, severity) où severity dans ('low','medium','high','info')
-        La classification combine règles heuristiques (numéros bien connus),
-        l'information sur les processus (ex: processus root) et le contenu du banner.
+        Délègue au moteur de règles partagé de check_port (règles personnalisables
+        via $CHECK_PORT_RULES).
         """
-        # Normaliser
-        service = (service_name or "").lower()
-        b = (banner or "").lower()
+        return classify_port(port, service_name, pid_infos, banner, target_ip)
 
-        # Priorité: dynamique (plage éphémère)
-        if 32768 <= port <= 65535:
-            return ("🟢 Dynamique", 'low')
-
-        # Flags basés sur PID (si disponible)
-        runs_as_root = False
-        try:
-            for p in (pid_infos or []):
-                if p.get('user') in ('root', '0', 'administrator'):
-                    runs_as_root = True
-                    break
-        except Exception:
-            runs_as_root = False
-
-        # Lists of well-known ports
-        remote_ports = {22, 3389, 5900, 23}
-        web_ports = {80, 443, 8080, 8443}
-        db_ports = {3306, 5432, 27017, 1433, 1521, 6379}
-        mail_ports = {25, 587, 110, 143, 993, 995}
-        fileshare_ports = {139, 445}
-        insecure_plain = {21, 23, 69}
-
-        # Detecteurs dans le banner
-        is_http_banner = ('http/' in b) or ('server:' in b and 'http' in b)
-        is_ssh_banner = b.startswith('ssh-') or 'openssh' in b
-
-        # Assignation par port/service
-        if port in remote_ports or 'ssh' in service or is_ssh_banner:
-            label = "🔴 Critique — Accès distant"
-            return (label + (" (root)" if runs_as_root else ""), 'high')
-
-        if port in web_ports or 'http' in service or is_http_banner:
-            # Differentier HTTP vs HTTPS
-            if port in (443, 8443) or 'https' in service or 'ssl' in b or 'tls' in b:
-                label = "🟡 Web — HTTPS"
-                severity = 'medium'
-            else:
-                label = "🟡 Web — HTTP"
-                severity = 'medium'
-            if runs_as_root:
-                severity = 'high'
-                label += " (process root)"
-            return (label, severity)
-
-        if port in db_ports or any(k in service for k in ('mysql', 'postgres', 'mongodb', 'redis', 'mssql', 'oracle')):
-            return ("🔴 Base de données — Critique", 'high')
-
-        if port in mail_ports or any(k in service for k in ('smtp', 'imap', 'pop3')):
-            return ("🟠 Mail — Vérifier authentification/relay", 'medium')
-
-        if port in fileshare_ports or any(k in service for k in ('smb', 'cifs')):
-            return ("🔴 Partage de fichiers — Sensible", 'high')
-
-        if port in insecure_plain or any(k in service for k in ('telnet', 'ftp', 'tftp')):
-            return ("🔴 Non chiffré — Insecure (cleartext)", 'high')
-
-        # Privileged port check
-        if port < 1024:
-            if service_name and service_name.lower() not in ('unknown', 'port-dynamique'):
-                return (f"🔒 Privilégié — {service_name}", 'medium')
-            return ("🔒 Privilégié (port <1024)", 'medium')
-
-        # Suspicious heuristics: unknown service and not common
-        common_known = remote_ports | web_ports | db_ports | mail_ports | fileshare_ports | insecure_plain
-        if (service_name is None or service_name.lower() in ('unknown', '')) and port not in common_known:
-            return ("🔴 Suspicious — Service inconnu", 'high')
-
-        # Default
-        return ("🟡 Service", 'low')
-    
     def start_scan(self):
         """Démarre le scan en arrière-plan"""
         if self.scan_running:
@@ -785,28 +830,69 @@ class PortScannerGUI:
             messagebox.showerror("Erreur", "Veuillez spécifier des ports")
             return
         
+        rate_arg = self.rate_var.get().strip()
+        try:
+            rate = float(rate_arg) if rate_arg else None
+        except ValueError:
+            messagebox.showerror("Erreur", "Le débit max doit être un nombre de connexions par seconde")
+            return
+        rate = rate if rate and rate > 0 else None
+
         self.scan_running = True
         self.scan_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.clear_results()
         
-        # Démarrer le thread de scan
+        # Démarrer le thread de scan; l'affichage suit via le minuteur de progression
+        engine = self.engine_var.get() or DEFAULT_ENGINE
+        self.progress = ScanProgress()
         self.scan_thread = threading.Thread(
             target=self.run_scan,
-            args=(target, ports_arg),
+            args=(target, ports_arg, engine, self.banner_var.get(), self.all_addresses_var.get(), rate,
+                  self.local_var.get(), self.progress),
             daemon=True
         )
         self.scan_thread.start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+
+    def poll_progress(self):
+        """Minuteur Tk: affiche l'état publié par le thread de scan et les nouveaux ports
+        ouverts (par lots), puis termine le scan."""
+        state = self.progress
+        if state.total:
+            self.progress_var.set(state.scanned / state.total * 100)
+        batch = state.found[state.shown:state.shown + STREAM_BATCH]
+        if batch:
+            state.shown += len(batch)
+            self.add_results(batch)
+        if not state.done or state.shown < len(state.found):
+            if self.scan_running:
+                self.progress_label.config(text=state.describe())
+            self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+            return
+        if state.message:
+            self.progress_label.config(text=f"{state.message} - {len(self.scan_results)} port(s) ouvert(s) affiché(s)")
+        else:
+            self.show_summary()
+        self.scan_finished()
     
-    def run_scan(self, target, ports_arg):
-        """Exécute le scan (dans un thread séparé)"""
+    def run_scan(self, target, ports_arg, engine=DEFAULT_ENGINE, banner=True, all_addresses=False, rate=None,
+                 local=False, state=None):
+        """Exécute le scan (dans un thread séparé) et publie sa progression dans `state`"""
+        state = state or ScanProgress()
         try:
-            # Résolution DNS
+            # Résolution DNS (une fois par cible: hôte, CIDR, plage ou fichier)
             try:
-                target_ip = socket.gethostbyname(target)
+                resolved, errors = resolve_targets(parse_targets(target), all_addresses)
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Erreur DNS", f"Impossible de résoudre {target}: {e}"))
+                self.root.after(0, lambda err=e: messagebox.showerror("Erreur Cible", f"Cible invalide {target}: {err}"))
                 return
+            if not resolved:
+                msg = "\n".join(f"{name}: {e}" for name, e in errors) or target
+                self.root.after(0, lambda: messagebox.showerror("Erreur DNS", f"Impossible de résoudre:\n{msg}"))
+                return
+            target_ips = [ip for _, ip in resolved]
+            where = target_ips[0] if len(target_ips) == 1 else f"{len(target_ips)} hôtes"
             
             # Parse des ports
             try:
@@ -815,8 +901,9 @@ class PortScannerGUI:
                 self.root.after(0, lambda: messagebox.showerror("Erreur Ports", f"Format de ports invalide: {e}"))
                 return
             
-            num_ports = len(ports)
-            self.root.after(0, lambda: self.progress_label.config(text=f"Scan de {num_ports} ports sur {target_ip}..."))
+            num_ports = len(ports) * len(target_ips)
+            state.total = num_ports
+            state.status = f"Scan de {num_ports} ports sur {where}..."
             
             # Configuration optimisée
             if num_ports > 10000:
@@ -828,93 +915,94 @@ class PortScannerGUI:
             else:
                 timeout = DEFAULT_TIMEOUT
                 workers = min(DEFAULT_WORKERS, max(50, num_ports))
+            engine = resolve_engine(engine, num_ports)
+            workers, controller = plan_concurrency(engine, workers, num_ports)
+            limiter = TokenBucket(rate) if rate else None
+            state.controller, state.limiter, state.rate = controller, limiter, rate
+            state.started = time.monotonic()
             
-            # Scan
-            scanned_count = 0
-            open_ports = []
+            # Index port -> PID construit avant le scan: les lignes sont enrichies dès leur arrivée
+            refresh_pid_index()
+            show_dynamic = self.show_dynamic_var.get()
             
-            with ThreadPoolExecutor(max_workers=workers) as executor:
-                futures = {executor.submit(scan_port, target_ip, p, timeout): p for p in ports}
-                
-                for future in as_completed(futures):
+            # Timeout adaptatif par cible: le palier ne sert que de valeur initiale
+            rtts = {ip: RttEstimator(initial=timeout) for ip in target_ips}
+            results = None
+            if local and all(is_local_target_strict(ip) for ip in target_ips):
+                try:
+                    results = scan_local(target_ips, ports, banner=banner)
+                except OSError:
+                    results = None  # pas de /proc/net: scan réseau classique
+            if results is None:
+                results = scan_targets(target_ips, ports, rtts, workers, engine, controller, banner, limiter)
+            try:
+                for host, port, status, info in results:
                     if not self.scan_running:  # Check si arrêt demandé
                         break
                     
-                    port, status, banner = future.result()
-                    scanned_count += 1
-                    
-                    if status == "open":
-                        open_ports.append((port, banner))
+                    # Simple compteur: l'affichage est cadencé par poll_progress
+                    state.scanned += 1
                     
-                    # Mise à jour de la progression
-                    progress = (scanned_count / num_ports) * 100
-                    self.root.after(0, lambda p=progress: self.progress_var.set(p))
-                    
-                    if scanned_count % max(1, num_ports // 20) == 0:
-                        self.root.after(0, lambda c=scanned_count, t=num_ports: 
-                                       self.progress_label.config(text=f"Scanné {c}/{t} ports..."))
+                    # Publication immédiate (hors ports dynamiques masqués)
+                    if status == "open" and (show_dynamic or get_service_info(port)[0] != "Port-Dynamique"):
+                        state.found.append((host, port, info))
+            finally:
+                # Libère les connexions en vol si le scan a été interrompu
+                results.close()
             
             if not self.scan_running:
-                self.root.after(0, lambda: self.progress_label.config(text="Scan arrêté"))
-                return
-            
-            # Filtrage des ports dynamiques
-            show_dynamic = self.show_dynamic_var.get()
-            if not show_dynamic:
-                display_ports = [(p, b) for (p, b) in open_ports if get_service_info(p)[0] != "Port-Dynamique"]
-            else:
-                display_ports = open_ports[:]
-            
-            # Ajout des résultats à l'interface
-            self.root.after(0, lambda: self.populate_results(display_ports, target_ip))
+                state.message = "Scan arrêté"
             
         except Exception as e:
             self.root.after(0, lambda: messagebox.showerror("Erreur de Scan", f"Erreur durant le scan: {e}"))
         finally:
-            self.root.after(0, self.scan_finished)
+            state.done = True
     
-    def populate_results(self, open_ports, target_ip):
-        """Remplit le tableau avec les résultats"""
-        self.scan_results = []
+    def add_results(self, open_ports):
+        """Insère des ports ouverts (tuples (ip, port, banner)) à leur place dans le tableau trié
+
+        Les lignes apparaissent immédiatement avec des PID en attente; la recherche
+        des processus tourne sur le pool d'enrichissement (voir enrich_rows).
+        """
+        added = []
+        # Analyse de sécurité provisoire (sans PID): tout le lot en un appel au moteur de règles
+        labels = classify_ports((port, get_service_info(port)[0], None, banner) for _, port, banner in open_ports)
         
-        for port, banner in sorted(open_ports):
+        for (target_ip, port, banner), (security, _) in zip(open_ports, labels):
             service_name, service_cmd, _ = get_service_info(port)
+            key = (host_sort_key(target_ip), port)
+            index = bisect.bisect(self.result_keys, key)
             
-            # Récupération des PID
-            pid_infos = get_pids_for_port(port)
-            if pid_infos:
-                pid_display = ", ".join(f"{x['pid']}" for x in pid_infos)
-                process_display = ", ".join(f"{x['name']}" for x in pid_infos)
-            else:
-                pid_display = "Inconnu"
-                process_display = "Inconnu" if not self.is_admin else "Aucun"
-            
-            # Analyse de sécurité (heuristiques améliorées)
-            security, _ = self.classify_port(port, service_name, pid_infos, banner, target_ip)
-            
-            # Ajout à l'arbre
-            item_id = self.tree.insert("", tk.END, values=(
+            # Ajout à l'arbre à la position triée, PID et processus en attente
+            item_id = self.tree.insert("", index, values=(
+                target_ip,
                 port,
                 service_name,
-                pid_display,
-                process_display[:30] + "..." if len(process_display) > 30 else process_display,
+                PID_PENDING,
+                PID_PENDING,
                 security,
                 "Double-clic"
             ))
             
-            # Stockage des données complètes
-            self.scan_results.append({
+            # Stockage des données complètes (pid_infos None = recherche en cours)
+            res = {
                 "item_id": item_id,
                 "port": port,
                 "service_name": service_name,
                 "service_cmd": service_cmd,
                 "banner": banner,
-                "pid_infos": pid_infos,
+                "pid_infos": None,
                 "target_ip": target_ip
-            })
-        
-        # Mise à jour du statut
-        num_results = len(open_ports)
+            }
+            self.result_keys.insert(index, key)
+            self.scan_results.insert(index, res)
+            added.append(res)
+
+        self.enrich_rows(added)
+
+    def show_summary(self):
+        """Affiche le bilan du scan terminé"""
+        num_results = len(self.scan_results)
         if num_results == 0:
             status_text = "Aucun port ouvert détecté"
             if not self.show_dynamic_var.get():
@@ -925,6 +1013,74 @@ class PortScannerGUI:
         self.progress_label.config(text=status_text)
         self.progress_var.set(100)
     
+    def enrich_rows(self, results):
+        """Lance la recherche des PID des lignes données sur le pool d'arrière-plan.
+
+        Une seule recherche par port, partagée par les lignes de tous les hôtes.
+        """
+        by_port = {}
+        for res in results:
+            by_port.setdefault(res["port"], []).append(res)
+        generation = self.enrich_generation
+        for port, port_rows in by_port.items():
+            self.enrich_pending += 1
+            self.enrich_pool.submit(self._lookup_pids, generation, port, port_rows)
+        if by_port and not self.enrich_polling:
+            self.enrich_polling = True
+            self.root.after(ENRICH_POLL_MS, self.drain_enrichment)
+
+    def _lookup_pids(self, generation, port, port_rows):
+        """Tâche du pool: aucun accès à Tk ici, le résultat passe par la file."""
+        try:
+            pid_infos = get_pids_for_port(port)
+        except Exception:
+            pid_infos = []
+        self.enrich_queue.put((generation, port_rows, pid_infos))
+
+    def drain_enrichment(self):
+        """Minuteur Tk: applique par lots les PID arrivés depuis le dernier passage."""
+        try:
+            for _ in range(ENRICH_BATCH):
+                try:
+                    generation, port_rows, pid_infos = self.enrich_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if generation != self.enrich_generation:
+                    continue  # résultats effacés entre-temps
+                self.enrich_pending -= 1
+                labels = classify_ports((res["port"], res["service_name"], pid_infos, res["banner"])
+                                        for res in port_rows)
+                for res, (security, _) in zip(port_rows, labels):
+                    res["pid_infos"] = pid_infos
+                    self.update_row(res, security)
+        finally:
+            if self.enrich_pending > 0:
+                self.root.after(ENRICH_POLL_MS, self.drain_enrichment)
+            else:
+                self.enrich_polling = False
+
+    def update_row(self, res, security):
+        """Réécrit les colonnes PID/processus/sécurité d'une ligne déjà affichée."""
+        pid_infos = res["pid_infos"]
+        if pid_infos:
+            pid_display = ", ".join(f"{x['pid']}" for x in pid_infos)
+            process_display = ", ".join(f"{x['name']}" for x in pid_infos)
+        else:
+            pid_display = "Inconnu"
+            process_display = "Inconnu" if not self.is_admin else "Aucun"
+        try:
+            self.tree.item(res["item_id"], values=(
+                res["target_ip"],
+                res["port"],
+                res["service_name"],
+                pid_display,
+                process_display[:30] + "..." if len(process_display) > 30 else process_display,
+                security,
+                "Double-clic"
+            ))
+        except tk.TclError:
+            pass  # ligne supprimée entre-temps
+
     def scan_finished(self):
         """Nettoie après la fin du scan"""
         self.scan_running = False
@@ -941,6 +1097,9 @@ class PortScannerGUI:
         for item in self.tree.get_children():
             self.tree.delete(item)
         self.scan_results = []
+        self.result_keys = []
+        self.enrich_generation += 1
+        self.enrich_pending = 0
         self.progress_var.set(0)
         self.progress_label.config(text="Prêt pour le scan")
     
@@ -1063,6 +1222,7 @@ class PortScannerGUI:
         pid_infos = []
         if local:
             try:
+                refresh_pid_index()
                 pid_infos = get_pids_for_port(result['port'])
             except Exception:
                 pid_infos = result.get('pid_infos', []) or []
@@ -1222,6 +1382,8 @@ class PortScannerGUI:
         # - si aucun PID et le port est fermé, supprime la ligne
         # - si aucun PID mais le port reste ouvert, affiche "Inconnu" pour PID
         try:
+            # Une seule relecture de la table des sockets pour toutes les lignes
+            refresh_pid_index()
             # Faire une copie car on peut modifier self.scan_results pendant l'itération
             for res in list(self.scan_results):
                 port = res.get('port')
@@ -1248,6 +1410,7 @@ class PortScannerGUI:
                     # Mettre à jour l'item tree
                     try:
                         self.tree.item(res['item_id'], values=(
+                            target_ip,
                             port,
                             res.get('service_name') or get_service_info(port)[0],
                             pid_display,
@@ -1271,6 +1434,7 @@ class PortScannerGUI:
                         # Port ouvert mais PID inconnu
                         try:
                             self.tree.item(res['item_id'], values=(
+                                target_ip,
                                 port,
                                 res.get('service_name') or get_service_info(port)[0],
                                 'Inconnu',
@@ -1288,7 +1452,9 @@ class PortScannerGUI:
                         except Exception:
                             pass
                         try:
-                            self.scan_results.remove(res)
+                            index = self.scan_results.index(res)
+                            del self.scan_results[index]
+                            del self.result_keys[index]
                         except ValueError:
                             pass
 